@@ -1,19 +1,152 @@
 # app.py – Final Streamlit Question Paper Generator (Individual Regenerate + Scaling)
 
 import streamlit as st
-import os
 import zipfile
-import tempfile
 import io
 import time
+import secrets
 from datetime import datetime
 
 # Your existing imports — unchanged
 from question import Question
-from extract_gen_plain_qb import extract_text_from_pdf as extract_plain, create_plain_text_structured_pdf, course_outcomes
-from extract_qb import extract_text_from_pdf, extract_header, extract_questions
-from cat_rules import generate_cat1_paper, generate_cat2_paper, generate_endsem_paper
-from generate_pdf1 import generate_pdf, generate_pdf_endsem
+from bank_cache import load_bank
+from question_pool import QuestionPool
+from parallel_render import render_paper, render_versions
+from reportlab.lib.pagesizes import A4
+from reportlab.pdfgen import canvas
+from bank_cache import bank_key
+from batch_generator import best_papers, encode
+from version_planner import VersionPlanner, version_seed
+from exposure_ledger import ExposureLedger, freshness
+from capacity import analyze
+
+# Top-scoring candidates tried against the overlap budget in optimise mode
+OPTIMISE_TOP = 50
+
+
+def get_exam_pool(exam_type, uploaded_files):
+    # Parse the uploads once and keep the pool in the session: selection never
+    # mutates questions, so every version and every regenerate shares it
+    key = (exam_type, tuple(bank_key(uploaded.getvalue()) for uploaded in uploaded_files))
+    cached = st.session_state.get("exam_pool")
+    if cached and cached[0] == key:
+        return cached[1]
+
+    # The uploads are parsed straight from memory
+    banks = [uploaded.getvalue() for uploaded in uploaded_files]
+    if exam_type in ["cat1", "cat2"]:
+        header, questions, cos = load_bank(banks[0])
+    else:  # endsem
+        header, questions1, cos1 = load_bank(banks[0])
+        _, questions2, cos2 = load_bank(banks[1])
+
+        header["exam_type"] = "END SEMESTER EXAMINATION"
+
+        cos = cos1 or cos2
+
+        questions = questions1 + questions2
+
+    exam_pool = (header, QuestionPool(questions), cos)
+    st.session_state.exam_pool = (key, exam_pool)
+    return exam_pool
+
+
+def recent_exposure(subject_code, exams):
+    # qids used by the subject's last `exams` issued exams (every issued exam
+    # when exams is 0)
+    with ExposureLedger() as ledger:
+        return ledger.recent(subject_code, exams or None)
+
+
+def get_fresh_pool(exam_pool, exclude_recent):
+    # exam_pool without the questions of the subject's last exclude_recent
+    # issued exams; kept in the session so the planner sees one pool object
+    header, pool, cos = exam_pool
+    if not exclude_recent or not header.get("subject_code"):
+        return exam_pool
+    key = (id(pool), exclude_recent, st.session_state.get("ledger_version", 0))
+    cached = st.session_state.get("fresh_pool")
+    if cached and cached[0] == key:
+        return cached[1]
+    exposed = recent_exposure(header["subject_code"], exclude_recent)
+    fresh_pool = (header, pool.excluding(exposed), cos)
+    st.session_state.fresh_pool = (key, fresh_pool)
+    return fresh_pool
+
+
+def get_planner(exam_type, exam_pool, max_overlap, fresh=False):
+    # One planner per pool and overlap budget, kept across reruns so a
+    # regenerated version is checked against the versions still on screen
+    key = (id(exam_pool[1]), exam_type, max_overlap)
+    cached = st.session_state.get("version_planner")
+    if fresh or not cached or cached[0] != key:
+        cached = (key, VersionPlanner(exam_pool[1], exam_type, max_overlap))
+        st.session_state.version_planner = cached
+        st.session_state.version_index = {}
+    return cached[1]
+
+
+def get_encoded(planner, pool):
+    # The pool as arrays for the batch generator, built once per planner
+    key = (id(planner), id(pool))
+    cached = st.session_state.get("encoded_pool")
+    if cached and cached[0] == key:
+        return cached[1]
+    enc = encode(pool, planner.plan)
+    st.session_state.encoded_pool = (key, enc)
+    return enc
+
+
+def select_questions(planner, exam_type, pool, seed, optimise=False, index=None):
+    # Returns (seed, paper); the seed and the other versions recreate the paper
+    if optimise:
+        # Best of many vectorized draws, scored on CO coverage and Bloom
+        # balance, with the NumPy generator seeded from the version's stream.
+        # The planner's plan and encoding are reused, the draws are steered
+        # like the planner's own, and of the top-scoring candidates the best
+        # one within the overlap budget is taken.
+        enc = get_encoded(planner, pool)
+
+        def make(rng, avoid):
+            ranked = best_papers(planner.plan, enc, k=OPTIMISE_TOP, seed=rng.getrandbits(64), avoid=avoid)
+            for _, paper in ranked:
+                if planner.fits(planner.mask(paper), skip=index):
+                    return paper
+            return ranked[0][1]
+        return planner.draw(seed, attempts=20, index=index, make=make)
+    return planner.draw(seed, index=index)
+
+
+def render_version(exam_type, exam_pool, selected, output_path, branch, qcode, month_year, tallow=None, c=None):
+    # Returns the PDF's bytes when output_path and c are None
+    header, pool, cos = exam_pool
+    return render_paper(exam_type, header, cos, selected, branch, qcode, month_year, tallow, output_path, c)
+
+
+def render_merged(exam_type, exam_pool, papers, branch, qcode, month_year, tallow=None):
+    # All versions in one PDF for printing; the header is stored once and
+    # referenced from every version
+    buffer = io.BytesIO()
+    c = canvas.Canvas(buffer, pagesize=A4)
+    for selected in papers:
+        render_version(exam_type, exam_pool, selected, None, branch, qcode, month_year, tallow, c=c)
+    c.save()
+    return buffer.getvalue()
+
+
+def get_merged_pdf(exam_type, exam_pool, planner, indexes, branch, qcode, month_year, tallow=None):
+    # render_merged() once per set of versions on screen, not on every rerun.
+    # The versions' own PDFs are the key: they change with any input and when
+    # a version is regenerated (which replaces its paper in the planner)
+    key = (exam_type, tuple(pdf_bytes for _, _, pdf_bytes in st.session_state.generated_pdfs))
+    cached = st.session_state.get("merged_pdf_bytes")
+    if cached and cached[0] == key:
+        return cached[1]
+    data = render_merged(exam_type, exam_pool, [planner.papers[i] for i in indexes],
+                         branch, qcode, month_year, tallow)
+    st.session_state.merged_pdf_bytes = (key, data)
+    return data
+
 
 # Initialize session state
 if "generated_pdfs" not in st.session_state:
@@ -56,6 +189,7 @@ with col2:
     )
 
 # Permission message for End Semester
+tallow = None
 if exam_type == "endsem":
     tallow = st.text_input(
         "**Permission Message** (e.g., 'Calc, Log Book are allowed')",
@@ -75,6 +209,29 @@ num_versions = st.slider(
     help="Drag to select 1 to 5 versions"
 )
 
+max_overlap = None
+if num_versions > 1:
+    max_overlap = st.number_input(
+        "**Max questions shared by any two versions**",
+        min_value=0,
+        value=None,
+        step=1,
+        placeholder="No limit",
+        key="max_overlap",
+    )
+
+optimise = st.checkbox(
+    "**Optimise coverage** (pick the best of 2000 drafts for CO coverage and Bloom balance)",
+    value=False,
+    key="optimise",
+)
+
+seed_input = st.text_input(
+    "**Seed** (optional – the same seed and question banks give the same papers)",
+    value="",
+    key="seed",
+)
+
 # === FILE UPLOAD ===
 st.subheader("Upload Question Bank PDFs")
 
@@ -92,87 +249,122 @@ else:  # endsem
     if cat1_file and cat2_file:
         uploaded_files = [cat1_file, cat2_file]
 
+# === QUESTION HISTORY AND CAPACITY ===
+required = 1 if exam_type in ["cat1", "cat2"] else 2
+exclude_recent = 0
+if len(uploaded_files) == required:
+    try:
+        parsed_pool = get_exam_pool(exam_type, uploaded_files)
+    except Exception as e:
+        st.error(f"Could not read the question bank: {str(e)}")
+        parsed_pool = None
+
+    subject_code = parsed_pool[0].get("subject_code") if parsed_pool else None
+    if subject_code:
+        exclude_recent = st.number_input(
+            f"**Leave out questions used in the last N exams of {subject_code}** (0 keeps every question)",
+            min_value=0,
+            value=0,
+            step=1,
+            key="exclude_recent",
+        )
+        report = freshness(parsed_pool[1], recent_exposure(subject_code, exclude_recent))
+        fresh, total = report["all"]
+        window = f"the last {exclude_recent} exam{'s' if exclude_recent > 1 else ''}" if exclude_recent else "any issued exam"
+        parts = ", ".join(
+            f"Part {part}: {f}/{t}" for part, (f, t) in sorted(report.items()) if part != "all"
+        )
+        st.caption(
+            f"{fresh} of {total} distinct questions ({fresh / max(total, 1):.0%}) not used in {window} – {parts}"
+        )
+
+    # What the pool can produce, counted from the blueprint before anything is drawn
+    if parsed_pool is not None:
+        capacity = analyze(get_fresh_pool(parsed_pool, exclude_recent)[1], exam_type)
+        if capacity["problems"]:
+            st.warning(f"This bank cannot produce a {exam_type.upper()} paper: " + "; ".join(capacity["problems"]))
+        else:
+            papers = capacity["papers"]
+            papers = f"{papers:,}" if papers < 10**9 else f"{papers:.1e}"
+            section, where, needed, available = capacity["bottlenecks"][0]
+            st.caption(
+                f"Capacity: {papers} distinct papers; "
+                f"up to {capacity['versions']} version{'s' if capacity['versions'] != 1 else ''} sharing no question "
+                f"(limited by {capacity['limited_by']}); tightest draw: {section.replace('_', ' ')} {where}, "
+                f"{available} question{'s' if available != 1 else ''} for {needed} per paper"
+            )
+            if max_overlap == 0 and num_versions > capacity["versions"]:
+                st.warning(
+                    f"Only {capacity['versions']} version{'s' if capacity['versions'] != 1 else ''} "
+                    f"can share no question with each other; raise the overlap limit or generate fewer."
+                )
+
 # === GENERATE / REGENERATE ALL BUTTON ===
 button_label = "Regenerate All Versions" if st.session_state.results_generated else f"Generate {num_versions} Version{'s' if num_versions > 1 else ''}"
 if st.button(button_label, type="primary", use_container_width=True):
-    required = 1 if exam_type in ["cat1", "cat2"] else 2
     if len(uploaded_files) != required:
         st.error(f"Please upload {required} PDF{'s' if required > 1 else ''}.")
     else:
+        # Kept in the session: the rerun below would clear messages shown now
+        st.session_state.generation_errors = errors = []
         with st.spinner(f"Generating {num_versions} version{'s' if num_versions > 1 else ''}..."):
             st.session_state.generated_pdfs = []
             progress_bar = st.progress(0)
 
+            try:
+                exam_pool = get_fresh_pool(get_exam_pool(exam_type, uploaded_files), exclude_recent)
+            except Exception as e:
+                errors.append(f"Could not read the question bank: {str(e)}")
+                exam_pool = None
+
+            if exam_pool is not None:
+                try:
+                    planner = get_planner(exam_type, exam_pool, max_overlap, fresh=True)
+                except Exception as e:
+                    # The pool cannot fill the blueprint; the plan says why
+                    errors.append(f"Could not generate papers from this question bank: {str(e)}")
+                    exam_pool = None
+
+            if exam_pool is not None:
+                st.session_state.base_seed = seed_input.strip() or secrets.token_hex(4)
+                st.session_state.version_seeds = {}
+                st.session_state.regen_counts = {}
+                st.session_state.issue_recorded = False
+
+            # Questions are selected in order (each version is checked
+            # against the ones before it), then the versions are rendered in
+            # parallel and reported as each one finishes
+            papers = []
             for version in range(1, num_versions + 1):
-                progress_bar.progress((version - 1) / num_versions)
-
-                with tempfile.TemporaryDirectory() as tmpdir:
-                    pdf_paths = []
-                    for i, uploaded in enumerate(uploaded_files):
-                        temp_path = os.path.join(tmpdir, f"input_v{version}_{i}.pdf")
-                        with open(temp_path, "wb") as f:
-                            f.write(uploaded.getvalue())
-                        pdf_paths.append(temp_path)
-
-                    output_filename = f"{exam_type.upper()}_V{version}.pdf"
-                    output_path = os.path.join(tmpdir, output_filename)
-
-                    try:
-                        if exam_type in ["cat1", "cat2"]:
-                            plain_pdf = create_plain_text_structured_pdf(pdf_paths[0], os.path.join(tmpdir, "plain.pdf"))
-                            text = extract_text_from_pdf(plain_pdf)
-                            header = extract_header(text)
-                            questions = extract_questions(text)
-                            cos = course_outcomes(pdf_paths[0])
-
-                            selected = generate_cat1_paper(questions) if exam_type == "cat1" else generate_cat2_paper(questions)
-
-                            generate_pdf(
-                                header=header,
-                                selected_questions=selected,
-                                branch=branch,
-                                qcode=qcode,
-                                output_path=output_path,
-                                cos=cos,
-                                month_year=month_year,
-                                exam_type=exam_type
-                            )
-
-                        else:  # endsem
-                            plain1 = create_plain_text_structured_pdf(pdf_paths[0], os.path.join(tmpdir, "plain1.pdf"))
-                            plain2 = create_plain_text_structured_pdf(pdf_paths[1], os.path.join(tmpdir, "plain2.pdf"))
-
-                            text1 = extract_text_from_pdf(plain1)
-                            text2 = extract_text_from_pdf(plain2)
-
-                            header = extract_header(text1)
-                            header["exam_type"] = "END SEMESTER EXAMINATION"
-
-                            cos = course_outcomes(pdf_paths[0])
-                            if not cos:
-                                cos = course_outcomes(pdf_paths[1])
-
-                            questions = extract_questions(text1) + extract_questions(text2)
-                            selected = generate_endsem_paper(questions)
-
-                            generate_pdf_endsem(
-                                header=header,
-                                selected_questions=selected,
-                                branch=branch,
-                                qcode=qcode,
-                                output_path=output_path,
-                                cos=cos,
-                                month_year=month_year,
-                                exam_type=exam_type,
-                                tallow=tallow
-                            )
-
-                        with open(output_path, "rb") as f:
-                            pdf_bytes = f.read()
-                        st.session_state.generated_pdfs.append((version, output_filename, pdf_bytes))
-
-                    except Exception as e:
-                        st.error(f"Version {version} failed: {str(e)}")
+                if exam_pool is None:
+                    break
+                progress_bar.progress((version - 1) / (2 * num_versions), text=f"Selecting questions for version {version}")
+                try:
+                    seed = version_seed(st.session_state.base_seed, version)
+                    seed, selected = select_questions(planner, exam_type, exam_pool[1], seed, optimise)
+                    st.session_state.version_index[version] = len(planner.papers) - 1
+                    st.session_state.version_seeds[version] = seed
+                    papers.append((version, selected))
+
+                except Exception as e:
+                    errors.append(f"Version {version} failed: {str(e)}")
+
+            if papers:
+                header, _, cos = exam_pool
+                rendered = 0
+                for version, pdf_bytes, error in render_versions(
+                    exam_type, header, cos, papers, branch, qcode, month_year, tallow
+                ):
+                    rendered += 1
+                    progress_bar.progress(
+                        (num_versions + rendered) / (2 * num_versions),
+                        text=f"Rendered {rendered} of {len(papers)}",
+                    )
+                    if error is not None:
+                        errors.append(f"Version {version} failed: {str(error)}")
+                    else:
+                        st.session_state.generated_pdfs.append((version, f"{exam_type.upper()}_V{version}.pdf", pdf_bytes))
+                st.session_state.generated_pdfs.sort()
 
             progress_bar.progress(1.0)
 
@@ -180,6 +372,9 @@ if st.button(button_label, type="primary", use_container_width=True):
         st.rerun()
 
 # === DISPLAY RESULTS WITH INDIVIDUAL REGENERATE (Visually Appealing) ===
+for message in st.session_state.get("generation_errors", []):
+    st.error(message)
+
 if st.session_state.results_generated and st.session_state.generated_pdfs:
     st.markdown("---")
     st.success(f"Generated {len(st.session_state.generated_pdfs)} version{'s' if len(st.session_state.generated_pdfs) > 1 else ''}!")
@@ -194,6 +389,7 @@ if st.session_state.results_generated and st.session_state.generated_pdfs:
         with cols[idx]:
             with st.container():
                 st.markdown(f"**Version {version_num}**")
+                st.caption(f"Seed: {st.session_state.get('version_seeds', {}).get(version_num, '–')}")
                 st.download_button(
                     label=f"Download {filename}",
                     data=pdf_bytes,
@@ -204,74 +400,26 @@ if st.session_state.results_generated and st.session_state.generated_pdfs:
                 )
                 if st.button(f"Regenerate Version {version_num}", use_container_width=True, key=f"regen_v{version_num}"):
                     with st.spinner(f"Regenerating Version {version_num}..."):
-                        with tempfile.TemporaryDirectory() as tmpdir:
-                            pdf_paths = []
-                            for i, uploaded in enumerate(uploaded_files):
-                                temp_path = os.path.join(tmpdir, f"input_regen_{i}.pdf")
-                                with open(temp_path, "wb") as f:
-                                    f.write(uploaded.getvalue())
-                                pdf_paths.append(temp_path)
-
-                            output_path = os.path.join(tmpdir, filename)
-
-                            try:
-                                if exam_type in ["cat1", "cat2"]:
-                                    plain_pdf = create_plain_text_structured_pdf(pdf_paths[0], os.path.join(tmpdir, "plain.pdf"))
-                                    text = extract_text_from_pdf(plain_pdf)
-                                    header = extract_header(text)
-                                    questions = extract_questions(text)
-                                    cos = course_outcomes(pdf_paths[0])
-
-                                    selected = generate_cat1_paper(questions) if exam_type == "cat1" else generate_cat2_paper(questions)
-
-                                    generate_pdf(
-                                        header=header,
-                                        selected_questions=selected,
-                                        branch=branch,
-                                        qcode=qcode,
-                                        output_path=output_path,
-                                        cos=cos,
-                                        month_year=month_year,
-                                        exam_type=exam_type
-                                    )
-
-                                else:
-                                    plain1 = create_plain_text_structured_pdf(pdf_paths[0], os.path.join(tmpdir, "plain1.pdf"))
-                                    plain2 = create_plain_text_structured_pdf(pdf_paths[1], os.path.join(tmpdir, "plain2.pdf"))
-
-                                    text1 = extract_text_from_pdf(plain1)
-                                    text2 = extract_text_from_pdf(plain2)
-
-                                    header = extract_header(text1)
-                                    header["exam_type"] = "END SEMESTER EXAMINATION"
-
-                                    cos = course_outcomes(pdf_paths[0])
-                                    if not cos:
-                                        cos = course_outcomes(pdf_paths[1])
-
-                                    questions = extract_questions(text1) + extract_questions(text2)
-                                    selected = generate_endsem_paper(questions)
-
-                                    generate_pdf_endsem(
-                                        header=header,
-                                        selected_questions=selected,
-                                        branch=branch,
-                                        qcode=qcode,
-                                        output_path=output_path,
-                                        cos=cos,
-                                        month_year=month_year,
-                                        exam_type=exam_type,
-                                        tallow=tallow
-                                    )
-
-                                with open(output_path, "rb") as f:
-                                    new_bytes = f.read()
-
-                                # Update only this version
-                                st.session_state.generated_pdfs[idx] = (version_num, filename, new_bytes)
-
-                            except Exception as e:
-                                st.error(f"Regeneration failed: {str(e)}")
+                        try:
+                            exam_pool = get_fresh_pool(get_exam_pool(exam_type, uploaded_files), exclude_recent)
+                            planner = get_planner(exam_type, exam_pool, max_overlap)
+                            index = st.session_state.version_index.get(version_num)
+                            # A fresh stream for each regenerate of this version
+                            regen_counts = st.session_state.setdefault("regen_counts", {})
+                            regen_counts[version_num] = regen_counts.get(version_num, 0) + 1
+                            base_seed = st.session_state.setdefault("base_seed", secrets.token_hex(4))
+                            seed = f"{version_seed(base_seed, version_num)}-r{regen_counts[version_num]}"
+                            seed, selected = select_questions(planner, exam_type, exam_pool[1], seed, optimise, index)
+                            if index is None:
+                                st.session_state.version_index[version_num] = len(planner.papers) - 1
+                            st.session_state.setdefault("version_seeds", {})[version_num] = seed
+                            new_bytes = render_version(exam_type, exam_pool, selected, None, branch, qcode, month_year, tallow)
+
+                            # Update only this version
+                            st.session_state.generated_pdfs[idx] = (version_num, filename, new_bytes)
+
+                        except Exception as e:
+                            st.error(f"Regeneration failed: {str(e)}")
 
                     # After regeneration completes → show success message for 3 seconds
                     regen_placeholder.success(f"Version {version_num} regenerated successfully!")
@@ -330,6 +478,36 @@ if st.session_state.results_generated and st.session_state.generated_pdfs:
                     st.session_state.zip_download_clicked = True
                     st.rerun()
 
+        # Record the versions on screen so later exams can leave them out
+        exam_pool = st.session_state.get("exam_pool", (None, None))[1]
+        subject_code = exam_pool[0].get("subject_code") if exam_pool else None
+        if subject_code:
+            if st.session_state.get("issue_recorded"):
+                st.caption(f"Recorded as issued for {subject_code}.")
+            elif st.button("RECORD AS ISSUED", use_container_width=True, key="record_issue"):
+                planner = st.session_state.version_planner[1]
+                with ExposureLedger() as ledger:
+                    ledger.record(subject_code, exam_type, planner.papers, label=f"{exam_type.upper()} {month_year}")
+                st.session_state.ledger_version = st.session_state.get("ledger_version", 0) + 1
+                st.session_state.issue_recorded = True
+                st.rerun()
+
+        # Single PDF with every version, for printing
+        if len(st.session_state.generated_pdfs) > 1 and "version_planner" in st.session_state:
+            planner = st.session_state.version_planner[1]
+            indexes = [st.session_state.version_index.get(v) for v, _, _ in st.session_state.generated_pdfs]
+            if None not in indexes and len(uploaded_files) == required:
+                exam_pool = get_fresh_pool(get_exam_pool(exam_type, uploaded_files), exclude_recent)
+                st.download_button(
+                    label="DOWNLOAD ALL VERSIONS AS ONE PDF",
+                    data=get_merged_pdf(exam_type, exam_pool, planner, indexes, branch, qcode, month_year, tallow),
+                    file_name=f"{exam_type.upper()}_All_Versions.pdf",
+                    mime="application/pdf",
+                    use_container_width=True,
+                    type="secondary",
+                    key="merged_pdf",
+                )
+
         # Clear Button (completely independent)
         if st.button("CLEAR ALL RESULTS & START NEW", type="primary", use_container_width=True):
             st.session_state.generated_pdfs = []
@@ -0,0 +1,66 @@
+# bank_cache.py – content-addressed on-disk cache of parsed question banks
+import hashlib
+import os
+
+from question import Question
+from extract_qb import PARSER_VERSION
+from json_cache import JsonCache
+from incremental import extract_bank_incremental
+from pdf_source import pdf_bytes, pdf_data
+
+CACHE_DIR = os.environ.get(
+    "QPG_CACHE_DIR",
+    os.path.join(os.path.expanduser("~"), ".cache", "question-paper-generator", "banks"),
+)
+MAX_CACHE_BYTES = int(os.environ.get("QPG_CACHE_MAX_BYTES", 64 * 1024 * 1024))
+
+
+def bank_key(pdf_bytes):
+    digest = hashlib.sha256(pdf_bytes).hexdigest()
+    return f"{digest}-p{PARSER_VERSION}"
+
+
+class BankCache(JsonCache):
+    def __init__(self, cache_dir=CACHE_DIR, max_bytes=MAX_CACHE_BYTES):
+        super().__init__(cache_dir, max_bytes)
+
+    def get(self, key):
+        entry = self.load(key)
+        if entry is None:
+            return None
+        questions = [Question.from_dict(q) for q in entry["questions"]]
+        return entry["header"], questions, entry["course_outcomes"]
+
+    def put(self, key, header, questions, cos):
+        self.store(key, {
+            "parser_version": PARSER_VERSION,
+            "header": header,
+            "course_outcomes": cos,
+            "questions": [q.to_dict() for q in questions],
+        })
+
+
+_default_cache = None
+
+
+def default_cache():
+    global _default_cache
+    if _default_cache is None:
+        _default_cache = BankCache()
+    return _default_cache
+
+
+def load_bank(pdf_path, cache=None, workers=None):
+    # extract_bank() with a persistent cache in front of it. A miss (new or
+    # edited bank) still reuses every unchanged page of earlier uploads.
+    # pdf_path may also be the PDF's bytes or a binary file object (an
+    # upload), which is never written to disk.
+    cache = cache or default_cache()
+    source = pdf_data(pdf_path)
+    key = bank_key(pdf_bytes(source))
+    cached = cache.get(key)
+    if cached is not None:
+        return cached
+    header, questions, cos = extract_bank_incremental(source, workers=workers)
+    cache.put(key, header, questions, cos)
+    return header, questions, cos
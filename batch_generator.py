@@ -0,0 +1,232 @@
+# batch_generator.py – vectorized candidate-paper generation and scoring
+#
+# The pool is encoded as NumPy arrays (CO, Bloom, question key) and
+# thousands of candidate papers are drawn at once from the exam type's
+# blueprint plan. Every candidate is scored for course outcome coverage and
+# Bloom-level balance, and the best distinct papers are returned in the usual
+# {"PART_A", "PART_B", "PART_C"} structure.
+import numpy as np
+
+from blueprint import load_blueprint, or_pair
+from question_pool import QuestionPool
+
+
+class _Encoded:
+    def __init__(self, pool, key):
+        self.questions = pool.questions
+        qs = self.questions
+        self.co = np.array([int(q.co[2:]) for q in qs], dtype=np.int16)
+        self.bloom = np.array([int(q.bloom[1:]) for q in qs], dtype=np.int16)
+        # Questions with the same plan key (near-duplicates) share an id and
+        # may not appear together in a paper
+        self.key_ids = key_ids = {}
+        self.key_id = np.array([key_ids.setdefault(key(q), len(key_ids)) for q in qs], dtype=np.int64)
+        self._position = {id(q): i for i, q in enumerate(qs)}
+
+    def indices(self, questions):
+        return np.array([self._position[id(q)] for q in questions], dtype=np.int64)
+
+    def penalty(self, keys):
+        # 1.0 for every question whose plan key is in keys, else 0.0; added
+        # to the random sort keys it puts those questions after the others
+        ids = [self.key_ids[k] for k in keys if k in self.key_ids]
+        return np.isin(self.key_id, ids).astype(np.float64)
+
+
+def _sample(rng, rows, candidates, count, penalty=None):
+    # (rows, count) draws without replacement from candidates, in random order
+    keys = rng.random((rows, len(candidates)))
+    if penalty is not None:
+        keys += penalty[candidates]
+    if count < len(candidates):
+        cols = np.argpartition(keys, count - 1, axis=1)[:, :count]
+    else:
+        cols = np.tile(np.arange(len(candidates)), (rows, 1))
+    order = np.argsort(np.take_along_axis(keys, cols, axis=1), axis=1)
+    return candidates[np.take_along_axis(cols, order, axis=1)]
+
+
+def _pick_per_row(rng, unit_col, sources, count, valid, fill=-1, penalty=None):
+    # For each row, draw count questions from sources[unit_col[row]]; rows
+    # whose source is too small are marked invalid
+    out = np.full((len(unit_col), count), fill, dtype=np.int64)
+    for unit, candidates in sources.items():
+        mask = unit_col == unit
+        if not mask.any():
+            continue
+        if len(candidates) < count:
+            valid &= ~mask
+            continue
+        out[mask] = _sample(rng, int(mask.sum()), candidates, count, penalty)
+    return out
+
+
+def _mask_used(keys, candidate_keys, used_keys):
+    # Push candidates whose key is already in the row to the end
+    for j in range(used_keys.shape[1]):
+        keys[candidate_keys[None, :] == used_keys[:, j:j + 1]] = np.inf
+
+
+def _draw(rng, enc, plan, n, penalty=None):
+    # Vectorized SamplingPlan.sample(), one row per candidate paper. Returns
+    # [(key, kind, indices)] with (n, pairs, 2) indices for or_pairs and
+    # (n, count) for other sections (-1 for empty slots), and the rows that
+    # satisfy the blueprint. penalty (_Encoded.penalty) steers the draws away
+    # from questions, as SamplingPlan.sample's avoid does.
+    valid = np.ones(n, dtype=bool)
+    order = None
+    if plan.draw_units is not None:
+        units = np.array(plan.draw_units)
+        order = units[np.argsort(rng.random((n, len(units))), axis=1)]
+
+    sections = []
+    used = []
+    for (key, kind, data), s in zip(plan.steps, plan.blueprint.sections):
+        if kind == "per_unit":
+            out = np.hstack([_sample(rng, n, enc.indices(candidates), count, penalty) for candidates, count in data])
+
+        elif kind == "spread":
+            per_unit, everything = data
+            out = np.hstack([
+                _sample(rng, n, enc.indices(candidates), min(s["per_unit"], len(candidates)), penalty)
+                for candidates in per_unit if candidates
+            ] or [np.empty((n, 0), dtype=np.int64)])
+            needed = s["total"] - out.shape[1]
+            if needed > 0:
+                rest = enc.indices(everything)
+                keys = rng.random((n, len(rest)))
+                if penalty is not None:
+                    keys += penalty[rest]
+                for j in range(out.shape[1]):
+                    keys[rest[None, :] == out[:, j:j + 1]] = np.inf
+                out = np.hstack([out, rest[np.argsort(keys, axis=1)[:, :needed]]])
+            if s.get("shuffle"):
+                out = np.take_along_axis(out, np.argsort(rng.random(out.shape), axis=1), axis=1)
+
+        elif kind == "or_pairs":
+            sources = {u: enc.indices(candidates) for u, candidates in data.items()}
+            if "units" in s:
+                pairs = [_sample(rng, n, sources[u], 2, penalty) for u in s["units"]]
+            else:
+                pairs = [_pick_per_row(rng, order[:, slot], sources, 2, valid, penalty=penalty) for slot in s["slots"]]
+            out = np.stack(pairs, axis=1)
+
+        else:  # choice
+            if "units" in s:
+                labels = np.zeros(n, dtype=np.int64)
+                sources = {0: enc.indices(data[None])}
+            else:
+                slot = s["slot"]
+                if slot < order.shape[1]:
+                    labels = order[:, slot]
+                else:
+                    fallback = np.array(s["slot_fallback"])
+                    labels = order[np.arange(n), fallback[rng.integers(len(fallback), size=n)]]
+                sources = {u: enc.indices(candidates) for u, candidates in data.items()}
+            used_keys = enc.key_id[np.hstack(used)] if used and s.get("exclude_used") else None
+            out = np.full((n, s["count"]), -1, dtype=np.int64)
+            for label, candidates in sources.items():
+                mask = labels == label
+                if not mask.any():
+                    continue
+                keys = rng.random((int(mask.sum()), len(candidates)))
+                if penalty is not None:
+                    keys += penalty[candidates]
+                if used_keys is not None:
+                    _mask_used(keys, enc.key_id[candidates], used_keys[mask])
+                take = min(s["count"], len(candidates))
+                cols = np.argsort(keys, axis=1)[:, :take]
+                finite = np.isfinite(np.take_along_axis(keys, cols, axis=1))
+                out[mask, :take] = np.where(finite, candidates[cols], -1)
+                valid[mask] &= finite.sum(axis=1) >= s.get("min", 1)
+
+        sections.append((key, kind, out))
+        used.append(out.reshape(n, -1))
+    return sections, valid
+
+
+def _bincount_rows(values, present, width):
+    # Per-row histogram of values (ignoring entries where present is False)
+    rows = values.shape[0]
+    flat = np.where(present, values + np.arange(rows)[:, None] * width, rows * width)
+    return np.bincount(flat.ravel(), minlength=rows * width + 1)[:rows * width].reshape(rows, width)
+
+
+def score_candidates(enc, chosen, co_weight=1.0, bloom_weight=1.0):
+    # chosen: (n, m) question indices, -1 for empty slots. Score is the share
+    # of the pool's course outcomes covered plus the normalised entropy of the
+    # Bloom levels used.
+    present = chosen >= 0
+    safe = np.where(present, chosen, 0)
+
+    co_counts = _bincount_rows(enc.co[safe], present, int(enc.co.max()) + 1)
+    coverage = (co_counts > 0).sum(axis=1) / len(np.unique(enc.co))
+
+    bloom_counts = _bincount_rows(enc.bloom[safe], present, int(enc.bloom.max()) + 1)
+    p = bloom_counts / np.maximum(bloom_counts.sum(axis=1, keepdims=True), 1)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        entropy = -np.where(p > 0, p * np.log(p), 0.0).sum(axis=1)
+    levels = min(len(np.unique(enc.bloom)), chosen.shape[1])
+    balance = entropy / np.log(levels) if levels > 1 else np.zeros(len(chosen))
+
+    return co_weight * coverage + bloom_weight * balance
+
+
+def _distinct_rows(enc, chosen):
+    # No question (or near-duplicate) may appear twice in one paper
+    present = chosen >= 0
+    texts = np.where(present, enc.key_id[np.where(present, chosen, 0)], -1)
+    texts = np.sort(texts, axis=1)
+    dup = (texts[:, 1:] == texts[:, :-1]) & (texts[:, 1:] >= 0)
+    return ~dup.any(axis=1)
+
+
+def encode(pool, plan):
+    # The arrays best_papers() draws from; build once per pool and plan
+    return _Encoded(pool, plan.key)
+
+
+def best_papers(plan, enc, k=1, candidates=2000, seed=None, co_weight=1.0, bloom_weight=1.0, avoid=None):
+    # Up to k (score, paper) pairs, best first, all distinct, drawn from a
+    # bound plan and its encode()d pool; questions whose keys are in avoid
+    # are only drawn when a section runs out of others
+    rng = np.random.default_rng(seed)
+    penalty = enc.penalty(avoid) if avoid else None
+    sections, valid = _draw(rng, enc, plan, candidates, penalty)
+    chosen = np.hstack([out.reshape(candidates, -1) for _, _, out in sections])
+    valid &= _distinct_rows(enc, chosen)
+    if not valid.any():
+        raise ValueError(
+            f"No {plan.blueprint.name} paper without repeated questions could be drawn from this pool"
+        )
+
+    scores = np.where(valid, score_candidates(enc, chosen, co_weight, bloom_weight), -np.inf)
+    qs = enc.questions
+    results = []
+    seen = set()
+    for row in np.argsort(-scores, kind="stable"):
+        if not valid[row] or len(results) >= k:
+            break
+        key = tuple(chosen[row])
+        if key in seen:
+            continue
+        seen.add(key)
+        paper = {}
+        for name, kind, out in sections:
+            if kind == "or_pairs":
+                paper[name] = [or_pair(qs[main], qs[orr]) for main, orr in out[row]]
+            else:
+                paper[name] = [qs[i] for i in out[row] if i >= 0]
+        results.append((float(scores[row]), paper))
+    return results
+
+
+def generate_best_papers(pool, exam_type, k=1, candidates=2000, seed=None,
+                         co_weight=1.0, bloom_weight=1.0):
+    # Returns up to k (score, paper) pairs, best first, all distinct.
+    # exam_type names a blueprint; an infeasible pool raises ValueError from
+    # the plan before anything is drawn.
+    if not isinstance(pool, QuestionPool):
+        pool = QuestionPool(pool)
+    plan = load_blueprint(exam_type).plan(pool)
+    return best_papers(plan, encode(pool, plan), k, candidates, seed, co_weight, bloom_weight)
@@ -0,0 +1,133 @@
+# bench_lexer.py – lines/sec of bank line classification, old if-chains vs line_lexer
+#
+#   python bench_lexer.py [--units-repeat N]
+import argparse
+import random
+import re
+import time
+
+from line_lexer import classify_plain, classify_question_line, COBLOOM_AT_END, TEXT
+
+ROMAN = ["I", "II", "III", "IV", "V"]
+WORDS = (
+    "explain describe compare analyse the concept of binary tree stack queue graph "
+    "traversal algorithm complexity sorting hashing heap linked list recursion dynamic "
+    "programming with suitable example and illustrate its applications in detail"
+).split()
+
+
+def synthetic_bank(repeat, seed=0):
+    rnd = random.Random(seed)
+    lines = [
+        "CONTINUOUS ASSESSMENT TEST - I",
+        "2311ITC301T - Data Structures and Algorithms",
+        "Regulations R2023",
+        "Department of Information Technology",
+        "II Year / III Semester",
+        "Course Outcomes",
+        "CO1: Understand the basic data structures",
+        "CO2: Apply linear data structures",
+    ]
+    for _ in range(repeat):
+        for u, roman in enumerate(ROMAN, start=1):
+            lines.append(f"Unit - {roman}")
+            for part, n in zip("ABC", (12, 10, 6)):
+                lines.append(f"PART - {part}")
+                lines.append("Q.NO QUESTIONS CO'S BLOOM LEVEL")
+                for i in range(1, n + 1):
+                    words = [rnd.choice(WORDS) for _ in range(rnd.randint(6, 40))]
+                    chunks = [words[j:j + 12] for j in range(0, len(words), 12)]
+                    for ci, chunk in enumerate(chunks):
+                        text = " ".join(chunk)
+                        if ci == 0:
+                            text = f"{i}. {text.capitalize()}"
+                        if ci == len(chunks) - 1:
+                            text += f"? CO{u} K{rnd.randint(1, 6)}"
+                        lines.append(text)
+    return lines
+
+
+# --- the classification chains as they were before line_lexer ---------------
+
+def legacy_plain_kind(line):
+    if any(k in line.upper() for k in ["TEST", "REGULATIONS", "DEPARTMENT", "SEMESTER", "COURSE OUTCOMES"]):
+        return "title" if "TEST" in line.upper() else "subtitle"
+    if re.match(r"^\d{4}[A-Z]{3}\d{3}T", line):
+        return "code"
+    if line.startswith("CO") and ":" in line:
+        return "co"
+    if re.search(r"UNIT\s*[-–]?\s*[IVX12345]+", line, re.I):
+        return "unit"
+    if line.upper().startswith("PART"):
+        return "part"
+    if any(h in line.upper() for h in ["Q.NO", "QNO", "QUESTIONS", "CO'S", "BLOOM", "LEVEL"]):
+        return "skip"
+    if re.match(r"^(\d+)[\.\s]*(.*)", line):
+        return "qnum"
+    re.search(r"(CO\d+)\s*(K\d+)$", line.strip())
+    return "text"
+
+
+def legacy_question_kind(line):
+    if re.match(r"Unit\s*[–-]?\s*(I{1,5}|IV|V)\b", line, re.IGNORECASE):
+        return "unit"
+    if re.match(r"PART\s*[–-]?\s*([A-C])\b", line, re.IGNORECASE):
+        return "part"
+    if (
+        not line
+        or re.match(r"CO\d+:", line)
+        or re.match(r"Q.NO|QUESTIONS|CO’S|BLOOM|LEVEL", line, re.IGNORECASE)
+    ):
+        return "skip"
+    if re.match(r"^(\d{1,2})\.\s*(.*)$", line):
+        return "qnum"
+    return "text"
+
+
+def lexer_plain_kind(line):
+    kind, _ = classify_plain(line)
+    if kind == TEXT:
+        COBLOOM_AT_END.search(line.strip())
+    return kind
+
+
+def lexer_question_kind(line):
+    kind, _ = classify_question_line(line)
+    return kind
+
+
+def rate(fn, lines, rounds):
+    best = float("inf")
+    for _ in range(rounds):
+        start = time.perf_counter()
+        for line in lines:
+            fn(line)
+        best = min(best, time.perf_counter() - start)
+    return len(lines) / best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--units-repeat", type=int, default=40,
+                        help="copies of the five-unit synthetic bank (default 40)")
+    parser.add_argument("--rounds", type=int, default=5)
+    args = parser.parse_args()
+
+    lines = synthetic_bank(args.units_repeat)
+    stripped = [line.strip() for line in lines]
+
+    for legacy, lexer, sample, label in [
+        (legacy_plain_kind, lexer_plain_kind, lines, "plain layout"),
+        (legacy_question_kind, lexer_question_kind, stripped, "question stage"),
+    ]:
+        mismatches = [line for line in sample if legacy(line) != lexer(line)]
+        if mismatches:
+            raise SystemExit(f"{label}: lexer disagrees on {len(mismatches)} lines, e.g. {mismatches[0]!r}")
+        before = rate(legacy, sample, args.rounds)
+        after = rate(lexer, sample, args.rounds)
+        print(f"{label:15} {len(sample):7d} lines  before {before:12,.0f} lines/s  "
+              f"after {after:12,.0f} lines/s  x{after / before:.2f}")
+
+
+if __name__ == "__main__":
+    main()
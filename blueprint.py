@@ -0,0 +1,387 @@
+# blueprint.py – declarative paper blueprints
+#
+# A blueprint (blueprints/<name>.json) lists the sections of a paper and how
+# each one is drawn from the pool. It is compiled once into a Blueprint, then
+# bound to a pool as a SamplingPlan: the candidate lists are gathered and
+# every draw the blueprint could make is checked before anything is sampled,
+# so an unsatisfiable pool fails at once with all of its shortfalls.
+#
+# Section types:
+#   per_unit  exact counts of one part per unit
+#              {"part": "A", "counts": {"1": 2, "2": 2}}
+#   spread    up to per_unit from each unit, topped up to total from the rest
+#              {"part": "A", "units": [1, 2, 3, 4, 5], "per_unit": 2, "total": 10}
+#   or_pairs  one (a)/(b) pair per listed unit, or per drawn unit slot
+#              {"parts": ["B"], "units": [...]} or {"parts": ["B"], "slots": [0, 1]}
+#              optional "fallback_units": pool used when a unit has fewer than 2
+#   choice    up to count questions from the listed units or a drawn slot
+#              {"parts": ["C"], "fallback_parts": ["B"], "slot": 2, "count": 2, "min": 1}
+#              optional "slot_fallback": slots to pick from when the draw is short
+#              optional "exclude_used": the pool overlaps earlier sections
+#              (batch_generator only masks used questions when it is set)
+#
+# No question (or near-duplicate of one, see QuestionPool.key) is placed twice
+# in a paper. The feasibility check is draw_accounting.walk(): each draw
+# must be met by what its source holds after the earlier draws may have taken
+# their share, for some unit arrangement the draw can produce. Sampling only
+# uses the arrangements that pass, so a plan that binds never fails mid-draw.
+#
+# A top-level "unit_draw" shuffles its units once per paper; sections refer to
+# positions in that order as slots. With "require_part", only units that have
+# questions of that part take part in the draw.
+from collections import Counter, defaultdict
+from collections.abc import Mapping
+from functools import lru_cache
+import hashlib
+import json
+import os
+import random
+
+from draw_accounting import Groups, arrangements, describe, filled, text_key, unit_options, walk
+
+BLUEPRINT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "blueprints")
+
+SECTION_TYPES = ("per_unit", "spread", "or_pairs", "choice")
+
+
+def group_by_unit(questions):
+    # Accepts any iterable, including the lazy extract_qb.iter_questions()
+    # stream, so grouping proceeds while later pages are still being decoded.
+    # A mapping that is already grouped by unit and part (such as
+    # question_store.QuestionStore.grouped()) is used as is.
+    if isinstance(questions, Mapping):
+        return questions
+    by_unit = defaultdict(lambda: defaultdict(list))
+    for q in questions:
+        by_unit[q.unit][q.part].append(q)
+    return by_unit
+
+
+def or_pair(main, orr):
+    # Questions are shared by every version drawn from a pool, so the (a)/(b)
+    # labels travel next to them instead of being written into their text
+    return {"main": main, "or": orr, "labels": ("(a)", "(b)")}
+
+
+def _require(cond, name, message):
+    if not cond:
+        raise ValueError(f"Blueprint {name}: {message}")
+
+
+class Blueprint:
+    def __init__(self, spec):
+        self.name = spec.get("name", "?")
+        # Seeds are tied to the rules they were drawn under
+        canonical = json.dumps(spec, sort_keys=True, separators=(",", ":"))
+        self.digest = hashlib.sha256(canonical.encode("utf-8")).hexdigest()[:16]
+        draw = spec.get("unit_draw")
+        if draw is not None:
+            _require(draw.get("units"), self.name, "unit_draw needs units")
+            draw = {
+                "units": [int(u) for u in draw["units"]],
+                "require_part": draw.get("require_part"),
+                "min_units": int(draw.get("min_units", len(draw["units"]))),
+            }
+        self.unit_draw = draw
+
+        self.sections = []
+        for section in spec.get("sections", []):
+            key = section.get("key")
+            kind = section.get("type")
+            _require(key, self.name, "every section needs a key")
+            _require(kind in SECTION_TYPES, self.name, f"{key} has unknown type {kind!r}")
+            s = dict(section)
+            if kind == "per_unit":
+                s["counts"] = [(int(u), int(n)) for u, n in section["counts"].items()]
+            if kind in ("or_pairs", "choice"):
+                _require(
+                    ("units" in s) != ("slots" in s or "slot" in s),
+                    self.name,
+                    f"{key} needs either units or a drawn slot",
+                )
+            if "slots" in s or "slot" in s:
+                _require(draw, self.name, f"{key} uses a drawn slot but there is no unit_draw")
+                # or_pairs slots and slot_fallback must always be filled by the draw
+                for slot in s.get("slots", []) + s.get("slot_fallback", []):
+                    _require(0 <= slot < draw["min_units"], self.name, f"{key} slot {slot} may be empty")
+                slot = s.get("slot")
+                if slot is not None:
+                    _require(0 <= slot < len(draw["units"]), self.name, f"{key} slot {slot} is outside the unit draw")
+                    _require(
+                        slot < draw["min_units"] or s.get("slot_fallback"),
+                        self.name,
+                        f"{key} slot {slot} may be empty and has no slot_fallback",
+                    )
+            self.sections.append(s)
+
+    def plan(self, questions):
+        return SamplingPlan(self, group_by_unit(questions))
+
+
+@lru_cache(maxsize=None)
+def _load(path):
+    with open(path, encoding="utf-8") as f:
+        return Blueprint(json.load(f))
+
+
+def load_blueprint(name):
+    # name is a file under blueprints/ (without .json) or a path to one
+    path = name if name.endswith(".json") else os.path.join(BLUEPRINT_DIR, f"{name}.json")
+    return _load(os.path.abspath(path))
+
+
+def _gather(by_unit, units, parts):
+    return [q for u in units for p in parts for q in by_unit[u][p]]
+
+
+def _distinct(questions, key):
+    return len({key(q) for q in questions})
+
+
+def _pick(rng, candidates, count, used, key, minimum=None, avoid=None):
+    # Up to count questions whose keys are distinct and not in used; fewer
+    # than minimum (default count) is an error. Keys in avoid are only taken
+    # once the others run out, and the rest come first from the (unit, part)
+    # groups with the most of them left, so one paper does not drain a group
+    # the next ones need. The first draw almost always has no clash, so the
+    # full shuffle only runs when it does.
+    minimum = count if minimum is None else minimum
+    if count <= len(candidates) and not avoid:
+        picked = rng.sample(candidates, count)
+        keys = {key(q) for q in picked}
+        if len(keys) == count and used.isdisjoint(keys):
+            return picked
+    order = rng.sample(candidates, len(candidates))
+    if avoid:
+        fresh = Counter((q.unit, q.part) for q in candidates if key(q) not in avoid and key(q) not in used)
+        order.sort(key=lambda q: (key(q) in avoid, -fresh[q.unit, q.part]))
+    picked = []
+    seen = set(used)
+    for q in order:
+        k = key(q)
+        if k not in seen:
+            seen.add(k)
+            picked.append(q)
+            if len(picked) == count:
+                break
+    if len(picked) < minimum:
+        raise ValueError(f"Ran out of distinct questions (need {minimum}, found {len(picked)})")
+    return picked
+
+
+class SamplingPlan:
+    # Candidate lists for every section, gathered once per pool; sample()
+    # only shuffles and slices them. Questions with the same key count as one:
+    # a pool's near-duplicate cluster (QuestionPool.key) when it has one,
+    # otherwise the question's text id. Every membership test is a set lookup on
+    # these keys, so a paper costs the same on a merged pool of thousands.
+    def __init__(self, blueprint, by_unit):
+        self.blueprint = blueprint
+        self.key = qkey = getattr(by_unit, "key", None) or text_key
+        self.steps = []
+        problems = []
+        name = blueprint.name
+
+        draw_units = None
+        if blueprint.unit_draw:
+            draw = blueprint.unit_draw
+            part = draw["require_part"]
+            draw_units = [u for u in draw["units"] if part is None or by_unit[u][part]]
+            if len(draw_units) < draw["min_units"]:
+                problems.append(
+                    f"needs {draw['min_units']} of Units {draw['units']} with PART {part} questions, "
+                    f"pool has {len(draw_units)}"
+                )
+        self.draw_units = draw_units
+
+        for s in blueprint.sections:
+            key, kind = s["key"], s["type"]
+            if kind == "per_unit":
+                groups = []
+                for unit, count in s["counts"]:
+                    candidates = by_unit[unit][s["part"]]
+                    if _distinct(candidates, qkey) < count:
+                        problems.append(
+                            f"{key} needs {count} PART {s['part']} questions from Unit {unit}, "
+                            f"pool has {len(candidates)}"
+                        )
+                    groups.append((candidates, count))
+                self.steps.append((key, kind, groups))
+
+            elif kind == "spread":
+                per_unit = [by_unit[u][s["part"]] for u in s["units"]]
+                everything = [q for group in per_unit for q in group]
+                if _distinct(everything, qkey) < s["total"]:
+                    problems.append(
+                        f"{key} needs {s['total']} PART {s['part']} questions from Units {s['units']}, "
+                        f"pool has {len(everything)}"
+                    )
+                self.steps.append((key, kind, (per_unit, everything)))
+
+            elif kind == "or_pairs":
+                fallback = None
+                if "fallback_units" in s:
+                    # dict.fromkeys drops equal questions but keeps pool order
+                    fallback = list(dict.fromkeys(_gather(by_unit, s["fallback_units"], s["parts"])))
+                sources = {}
+                for u in s.get("units") or draw_units or []:
+                    candidates = _gather(by_unit, [u], s["parts"])
+                    if _distinct(candidates, qkey) < 2 and fallback is not None:
+                        candidates = fallback
+                    # a drawn unit that is short only rules out the
+                    # arrangements that use it, checked below
+                    if _distinct(candidates, qkey) < 2 and "units" in s:
+                        problems.append(
+                            f"{key} needs 2 PART {'/'.join(s['parts'])} questions in Unit {u} "
+                            f"for an OR pair, pool has {len(candidates)}"
+                        )
+                    sources[u] = candidates
+                self.steps.append((key, kind, sources))
+
+            else:  # choice
+                if "units" in s:
+                    pools = {None: s["units"]}
+                else:
+                    pools = {u: [u] for u in draw_units or []}
+                sources = {}
+                for label, units in pools.items():
+                    candidates = _gather(by_unit, units, s["parts"])
+                    parts = s["parts"]
+                    if not candidates and s.get("fallback_parts"):
+                        parts = s["fallback_parts"]
+                        candidates = _gather(by_unit, units, parts)
+                    available = _distinct(candidates, qkey)
+                    if available < s.get("min", 1) and "units" in s:
+                        problems.append(
+                            f"{key} needs {s.get('min', 1)} PART {'/'.join(parts)} questions "
+                            f"in Units {units}, pool has {available}"
+                        )
+                    sources[label] = candidates
+                self.steps.append((key, kind, sources))
+
+        # Sections share questions (fallback pools, overlapping parts), so
+        # each draw is also checked against what the ones before it may take
+        self._fillable = None
+        if not problems:
+            problems = self._check_consumption(by_unit)
+
+        if problems:
+            raise ValueError(f"{name} cannot be drawn from this pool: " + "; ".join(problems))
+
+    def _check_consumption(self, by_unit):
+        # Problems when no unit arrangement can be filled; otherwise sets
+        # _fillable to the arrangements that can, or None when all of them can
+        groups = Groups(by_unit, self.key)
+        fillable = set()
+        short = {}
+        options = arrangements(self.blueprint, self.draw_units)
+        for assigned in options:
+            _, draws = walk(self.blueprint, assigned, groups)
+            if filled(draws):
+                fillable.add(tuple(sorted(assigned.items())))
+                continue
+            for key, where, source, needed, _, available in draws:
+                if available < needed:
+                    short.setdefault(
+                        f"{key} for {where} needs {needed} from {describe(source)} after the "
+                        f"earlier draws, pool can guarantee {available}"
+                    )
+        if not fillable:
+            return list(short)
+        if len(fillable) < len(options):
+            self._fillable = fillable
+        return []
+
+    def _options(self, order):
+        # Assignments this unit order can produce that the pool can fill
+        return [
+            o for o in unit_options(self.blueprint, order)
+            if tuple(sorted(o.items())) in self._fillable
+        ]
+
+    def _slot(self, order, s, slot, rng, options):
+        if slot < len(order):
+            return order[slot]
+        units = [order[i] for i in s["slot_fallback"]]
+        if options is not None:
+            units = [u for u in units if any(o[s["key"]] == (u,) for o in options)]
+        return rng.choice(units)
+
+    def sample(self, rng=random, avoid=None):
+        # avoid: keys to leave out wherever the pool has others, such as the
+        # questions of versions already drawn
+        key = self.key
+        selected = {name: [] for name, _, _ in self.steps}
+        used = set()
+        order = None
+        options = None
+        if self.draw_units is not None:
+            order = list(self.draw_units)
+            rng.shuffle(order)
+            if self._fillable is not None:
+                # Some arrangements cannot be filled; draw the order again
+                # until it gives one that can
+                options = self._options(order)
+                while not options:
+                    rng.shuffle(order)
+                    options = self._options(order)
+
+        for (name, kind, data), s in zip(self.steps, self.blueprint.sections):
+            out = selected[name]
+            if kind == "per_unit":
+                for candidates, count in data:
+                    picked = _pick(rng, candidates, count, used, key, avoid=avoid)
+                    used.update(map(key, picked))
+                    out.extend(picked)
+
+            elif kind == "spread":
+                per_unit, everything = data
+                for candidates in per_unit:
+                    picked = _pick(rng, candidates, min(s["per_unit"], len(candidates)), used, key, 0, avoid)
+                    used.update(map(key, picked))
+                    out.extend(picked)
+                if len(out) < s["total"]:
+                    picked = _pick(rng, everything, s["total"] - len(out), used, key, 0, avoid)
+                    used.update(map(key, picked))
+                    out.extend(picked)
+                if s.get("shuffle"):
+                    rng.shuffle(out)
+
+            elif kind == "or_pairs":
+                units = s["units"] if "units" in s else [order[slot] for slot in s["slots"]]
+                for u in units:
+                    main, orr = _pick(rng, data[u], 2, used, key, avoid=avoid)
+                    used.add(key(main))
+                    used.add(key(orr))
+                    out.append(or_pair(main, orr))
+
+            else:  # choice
+                label = None if "units" in s else self._slot(order, s, s["slot"], rng, options)
+                picked = _pick(rng, data[label], s["count"], used, key, s.get("min", 1), avoid)
+                used.update(map(key, picked))
+                out.extend(picked)
+        return selected
+
+
+def paper_rng(bank_hash, blueprint, seed):
+    # Private random stream for one paper. String seeds are hashed with
+    # SHA-512 by random.Random, so the stream is the same on every run and
+    # platform for the same bank, blueprint and seed.
+    return random.Random(f"{bank_hash}:{blueprint.name}:{blueprint.digest}:{seed}")
+
+
+# Last plan bound per blueprint; a pool mapping is built once and not
+# changed afterwards, so every version drawn from it reuses the plan
+_bound = {}
+
+
+def generate_paper(name, questions, rng=None):
+    # rng defaults to the global random module
+    rng = rng or random
+    cached = _bound.get(name)
+    if cached is not None and cached[0] is questions:
+        return cached[1].sample(rng)
+    plan = load_blueprint(name).plan(questions)
+    if isinstance(questions, Mapping):
+        _bound[name] = (questions, plan)
+    return plan.sample(rng)
@@ -0,0 +1,117 @@
+# capacity.py – how many papers a pool can produce, counted without drawing
+#
+# Follows the same blueprint rules as SamplingPlan, but instead of sampling
+# it counts: every draw takes `count` distinct questions from a source (a set
+# of (unit, part) groups), so a paper is a product of binomials and the pool's
+# capacity is the sum over the distinct ways the unit draw can assign units
+# to sections. A paper is counted as its sections' contents: which questions
+# each section holds (and, for OR pairs, which two questions are paired), so
+# the same questions split differently between sections are different papers.
+# Order within a section and which question of a pair is (a) are not told
+# apart. The count is exact unless a fallback pool overlaps a later draw,
+# or the same text is listed under two groups, where it is a lower bound.
+import numpy as np
+
+from blueprint import group_by_unit, load_blueprint
+from draw_accounting import Groups, arrangements, describe, filled, same_papers, text_key, walk
+
+
+def _max_versions(fillable, groups, limit):
+    # Versions that share no question: added one at a time, each with the
+    # unit arrangement that leaves the most room, while every union of
+    # sources still holds what is drawn from inside it (Hall's condition). A
+    # choice section only has to reach its minimum.
+    # Greedy, so a lower bound when the blueprint has a unit draw.
+    sources = {src for draws in fillable for _, _, src, _, _, _ in draws}
+    unions = set(sources)
+    for a in sources:
+        for b in sources:
+            if not groups.keys(a).isdisjoint(groups.keys(b)):
+                unions.add(a | b)
+    unions = sorted(unions, key=sorted)
+    cap = np.array([groups.size(u) for u in unions])
+    demand = np.array([
+        [sum(needed for _, _, src, needed, _, _ in draws if groups.keys(src) <= groups.keys(u)) for u in unions]
+        for draws in fillable
+    ])
+    used = np.zeros(len(unions), dtype=np.int64)
+    versions = 0
+    while versions < limit:
+        room = (cap - used)[None, :] - demand
+        worst = room.min(axis=1)
+        best = int(worst.argmax())
+        if worst[best] < 0:
+            break
+        used += demand[best]
+        versions += 1
+    room = (cap - used)[None, :] - demand
+    tight = np.unravel_index(int(room.argmin()), room.shape)[1] if unions else None
+    return versions, (describe(unions[tight]) if tight is not None else None)
+
+
+def analyze(questions, exam_type, limit=999):
+    # {"papers", "arrangements", "unfillable", "bottlenecks", "problems",
+    #  "versions", "limited_by"}. bottlenecks lists the tightest draws as
+    # (section, where, needed, available); problems is non-empty when no
+    # paper can be drawn at all, exactly when SamplingPlan refuses the pool.
+    # unfillable counts unit arrangements the pool cannot fill.
+    blueprint = load_blueprint(exam_type)
+    by_unit = group_by_unit(questions)
+    groups = Groups(by_unit, getattr(by_unit, "key", None) or text_key)
+    problems = []
+
+    draw_units = None
+    draw = blueprint.unit_draw
+    if draw:
+        part = draw["require_part"]
+        draw_units = [u for u in draw["units"] if part is None or groups.size({(u, part)})]
+        if len(draw_units) < draw["min_units"]:
+            problems.append(
+                f"needs {draw['min_units']} of Units {draw['units']} with PART {part} questions, "
+                f"pool has {len(draw_units)}"
+            )
+            draw_units = None
+
+    # Arrangements are walked in the order the sampler draws them, and the
+    # same papers reached by swapping OR-pair slots are counted once, with
+    # the order that fills and leaves the most room
+    best = {}
+    if not problems:
+        for assigned in arrangements(blueprint, draw_units):
+            ways, draws = walk(blueprint, assigned, groups)
+            ok = filled(draws)
+            key = same_papers(blueprint, assigned)
+            if key not in best or (ok, ways) > best[key][:2]:
+                best[key] = (ok, ways, draws)
+    # an arrangement the pool cannot fill is one the sampler draws around,
+    # not a pool that cannot be used
+    fillable = [draws for ok, _, draws in best.values() if ok]
+    short = [draws for ok, _, draws in best.values() if not ok]
+    papers = sum(ways for ok, ways, _ in best.values() if ok)
+
+    tightest = {}
+    for draws in fillable or short:
+        for key, where, _, needed, takes, a in draws:
+            if (key, where) not in tightest or a < tightest[key, where][1]:
+                tightest[key, where] = (needed, a, takes)
+    # Fewest questions per question drawn first
+    bottlenecks = [
+        (key, where, needed, a)
+        for (key, where), (needed, a, takes) in sorted(
+            tightest.items(), key=lambda item: (item[1][1] / item[1][2], item[1][1] - item[1][0])
+        )
+    ]
+    if not fillable:
+        problems += [
+            f"{key} needs {needed} in {where}, pool has {a}" for key, where, needed, a in bottlenecks if a < needed
+        ]
+    versions, limited_by = _max_versions(fillable, groups, limit) if fillable else (0, None)
+    return {
+        "papers": papers,
+        "arrangements": len(fillable),
+        "unfillable": len(short),
+        "bottlenecks": bottlenecks[:3],
+        "problems": problems,
+        "versions": versions,
+        "limited_by": limited_by,
+    }
@@ -0,0 +1,166 @@
+# draw_accounting.py – what a blueprint's draws take from a pool, counted
+#
+# Shared by SamplingPlan (is there a unit arrangement every draw can meet?)
+# and capacity (how many papers, and how many disjoint versions?). A draw
+# takes distinct question keys from a source, a set of (unit, part) groups;
+# walk() follows the sections in order and reports, for every draw, what its
+# source still holds after the earlier draws may have taken their share.
+from itertools import permutations
+from math import comb
+
+
+def text_key(q):
+    # Without a pool's clusters, questions with the same text count as one
+    # even when they are listed under different parts or units
+    return q.tid
+
+
+class Groups:
+    # Distinct question keys per (unit, part) group and per union of groups.
+    # The same key may sit in several groups (one text under two parts), so
+    # overlaps between sources are measured on keys, not on groups.
+    def __init__(self, by_unit, key):
+        self.by_unit = by_unit
+        self.key = key
+        self._keys = {}
+
+    def keys(self, groups):
+        groups = frozenset(groups)
+        keys = self._keys.get(groups)
+        if keys is None:
+            if len(groups) == 1:
+                (unit, part), = groups
+                keys = {self.key(q) for q in self.by_unit[unit][part]}
+            else:
+                keys = set().union(*(self.keys({group}) for group in groups))
+            keys = self._keys[groups] = frozenset(keys)
+        return keys
+
+    def size(self, groups):
+        return len(self.keys(groups))
+
+
+def describe(groups):
+    by_part = {}
+    for unit, part in sorted(groups):
+        by_part.setdefault(part, []).append(str(unit))
+    return ", ".join(
+        f"PART {part} Unit{'s' if len(units) > 1 else ''} {', '.join(units)}"
+        for part, units in by_part.items()
+    )
+
+
+def unit_options(blueprint, order):
+    # {section key: units} assignments one unit order can produce: slotted
+    # sections take the units at their slots, a choice whose slot is empty
+    # any of its slot_fallback units. OR-pair units stay in slot order, the
+    # order the sampler draws the pairs in: when a fallback pool is shared,
+    # which pair is drawn first matters.
+    options = [{}]
+    for s in blueprint.sections:
+        if "slots" in s:
+            units = tuple(order[slot] for slot in s["slots"])
+            options = [dict(o, **{s["key"]: units}) for o in options]
+        elif "slot" in s:
+            if s["slot"] < len(order):
+                units = [order[s["slot"]]]
+            else:
+                units = sorted({order[i] for i in s["slot_fallback"]})
+            options = [dict(o, **{s["key"]: (u,)}) for o in options for u in units]
+    return options
+
+
+def arrangements(blueprint, draw_units):
+    # Distinct {section key: units} assignments the unit draw can produce
+    if draw_units is None:
+        return [{}]
+    seen = {}
+    for order in permutations(draw_units):
+        for o in unit_options(blueprint, order):
+            seen.setdefault(tuple(sorted(o.items())), o)
+    return list(seen.values())
+
+
+def same_papers(blueprint, assigned):
+    # Arrangements that only swap OR-pair slots give the same papers
+    pairs = {s["key"] for s in blueprint.sections if "slots" in s}
+    return tuple(sorted((key, tuple(sorted(units)) if key in pairs else units) for key, units in assigned.items()))
+
+
+def filled(draws):
+    # Every draw still finds what it needs after the earlier ones
+    return all(available >= needed for _, _, _, needed, _, available in draws)
+
+
+def spread_ways(sizes, per_unit, total):
+    # Sets of `total` questions with at least min(per_unit, size) from each
+    # unit: coefficient of x^total in prod_u sum_{k>=m_u} C(size_u, k) x^k
+    poly = [1]
+    for n in sizes:
+        low = min(per_unit, n)
+        term = [comb(n, k) if k >= low else 0 for k in range(min(n, total) + 1)]
+        out = [0] * min(len(poly) + len(term) - 1, total + 1)
+        for i, a in enumerate(poly):
+            if a:
+                for j, b in enumerate(term[:total + 1 - i]):
+                    out[i + j] += a * b
+        poly = out
+    return poly[total] if total < len(poly) else 0
+
+
+def walk(blueprint, assigned, groups):
+    # One unit arrangement: (papers, draws), draws being
+    # [(section, where, source, needed, takes, available)]
+    consumed = []
+    draws = []
+    ways = 1
+
+    def available(source):
+        keys = groups.keys(source)
+        n = len(keys)
+        for src, count in consumed:
+            taken = groups.keys(src)
+            if taken <= keys:
+                n -= count
+            elif not taken.isdisjoint(keys):
+                # a lower bound: the earlier draw may have taken only shared keys
+                n -= min(count, len(taken & keys))
+        return max(n, 0)
+
+    def take(key, where, source, needed, takes):
+        a = available(source)
+        draws.append((key, where, source, needed, takes, a))
+        consumed.append((source, min(takes, a)))
+        return a
+
+    for s in blueprint.sections:
+        key, kind = s["key"], s["type"]
+        if kind == "per_unit":
+            for unit, count in s["counts"]:
+                a = take(key, f"Unit {unit}", frozenset({(unit, s["part"])}), count, count)
+                ways *= comb(a, count)
+
+        elif kind == "spread":
+            sizes = [available(frozenset({(u, s["part"])})) for u in s["units"]]
+            source = frozenset((u, s["part"]) for u in s["units"])
+            take(key, f"Units {', '.join(map(str, s['units']))}", source, s["total"], s["total"])
+            ways *= spread_ways(sizes, s["per_unit"], s["total"])
+
+        elif kind == "or_pairs":
+            for u in assigned.get(key) or s["units"]:
+                source = frozenset((u, p) for p in s["parts"])
+                if groups.size(source) < 2 and "fallback_units" in s:
+                    source = frozenset((f, p) for f in s["fallback_units"] for p in s["parts"])
+                a = take(key, f"Unit {u}", source, 2, 2)
+                ways *= comb(a, 2)
+
+        else:  # choice
+            units = assigned.get(key) or s["units"]
+            source = frozenset((u, p) for u in units for p in s["parts"])
+            if not groups.size(source) and s.get("fallback_parts"):
+                source = frozenset((u, p) for u in units for p in s["fallback_parts"])
+            where = f"Unit {units[0]}" if len(units) == 1 else f"Units {', '.join(map(str, units))}"
+            needed = s.get("min", 1)
+            a = take(key, where, source, needed, s["count"])
+            ways *= comb(a, min(s["count"], a)) if a >= needed else 0
+    return ways, draws
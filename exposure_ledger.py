@@ -0,0 +1,128 @@
+# exposure_ledger.py – questions already used in issued papers, per subject
+#
+# Every issued exam records the ids of its questions with a timestamp. The
+# ids used by a subject's most recent exams are loaded once into a frozenset,
+# so excluding them from a pool is one hash lookup per question.
+import os
+import sqlite3
+import time
+
+from question_store import STORE_PATH, _signed, _unsigned
+from version_planner import paper_questions
+
+LEDGER_PATH = os.environ.get(
+    "QPG_LEDGER_PATH", os.path.join(os.path.dirname(STORE_PATH), "exposure.db")
+)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS issues (
+    issue_id INTEGER PRIMARY KEY,
+    subject_code TEXT NOT NULL,
+    exam_type TEXT NOT NULL,
+    label TEXT NOT NULL,
+    issued_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS exposures (
+    issue_id INTEGER NOT NULL REFERENCES issues (issue_id) ON DELETE CASCADE,
+    qid INTEGER NOT NULL,
+    PRIMARY KEY (issue_id, qid)
+);
+CREATE INDEX IF NOT EXISTS idx_issues_subject ON issues (subject_code, issued_at);
+"""
+
+
+class ExposureLedger:
+    def __init__(self, path=LEDGER_PATH):
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.conn = sqlite3.connect(path)
+        self.conn.execute("PRAGMA foreign_keys = ON")
+        self.conn.executescript(SCHEMA)
+        self._recent = {}
+
+    def close(self):
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def record(self, subject_code, exam_type, papers, label=None, issued_at=None):
+        # One issue for all versions of an exam: every question in any of
+        # papers counts as exposed from issued_at on
+        if not subject_code:
+            raise ValueError("Cannot record an exam without a subject code")
+        issued_at = time.time() if issued_at is None else issued_at
+        qids = {q.qid for paper in papers for q in paper_questions(paper)}
+        with self.conn:
+            cur = self.conn.execute(
+                "INSERT INTO issues (subject_code, exam_type, label, issued_at) VALUES (?, ?, ?, ?)",
+                (subject_code, exam_type, label or exam_type.upper(), issued_at),
+            )
+            issue_id = cur.lastrowid
+            self.conn.executemany(
+                "INSERT INTO exposures (issue_id, qid) VALUES (?, ?)",
+                ((issue_id, _signed(qid)) for qid in qids),
+            )
+        self._recent = {k: v for k, v in self._recent.items() if k[0] != subject_code}
+        return issue_id
+
+    def issues(self, subject_code):
+        # [(issue_id, exam_type, label, issued_at, questions)], newest first
+        rows = self.conn.execute(
+            "SELECT i.issue_id, i.exam_type, i.label, i.issued_at, COUNT(e.qid) "
+            "FROM issues i LEFT JOIN exposures e ON e.issue_id = i.issue_id "
+            "WHERE i.subject_code = ? GROUP BY i.issue_id ORDER BY i.issued_at DESC, i.issue_id DESC",
+            (subject_code,),
+        )
+        return rows.fetchall()
+
+    def recent(self, subject_code, exams=None, since=None):
+        # frozenset of qids used by the subject's last `exams` issues (all
+        # issues when None), optionally only those issued at or after since
+        key = (subject_code, exams, since)
+        cached = self._recent.get(key)
+        if cached is not None:
+            return cached
+        clauses = ["subject_code = ?"]
+        params = [subject_code]
+        if since is not None:
+            clauses.append("issued_at >= ?")
+            params.append(since)
+        query = (
+            "SELECT issue_id FROM issues WHERE " + " AND ".join(clauses)
+            + " ORDER BY issued_at DESC, issue_id DESC"
+        )
+        if exams is not None:
+            query += " LIMIT ?"
+            params.append(exams)
+        rows = self.conn.execute(
+            f"SELECT DISTINCT qid FROM exposures WHERE issue_id IN ({query})", params
+        )
+        qids = self._recent[key] = frozenset(_unsigned(qid) for qid, in rows)
+        return qids
+
+    def forget(self, issue_id):
+        with self.conn:
+            self.conn.execute("DELETE FROM issues WHERE issue_id = ?", (issue_id,))
+        self._recent = {}
+
+
+def freshness(pool, exposed):
+    # {part: (fresh, total)} in distinct questions (near-duplicate clusters
+    # count once) plus an "all" entry; a cluster is stale if any member was
+    # used
+    stale = {pool.key(q) for q in pool.questions if q.qid in exposed}
+    seen = set()
+    report = {}
+    for q in pool.questions:
+        key = pool.key(q)
+        if key in seen:
+            continue
+        seen.add(key)
+        for part in (q.part, "all"):
+            fresh, total = report.get(part, (0, 0))
+            report[part] = (fresh + (key not in stale), total + 1)
+    return report
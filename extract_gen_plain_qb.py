@@ -15,20 +15,122 @@ from reportlab.lib.pagesizes import A4
 from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer
 from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
 from reportlab.lib.units import inch
-import re
 import os
+from parallel_pages import resolve_workers, map_page_ranges
+from pdf_source import pdf_data, pdf_stream
+from line_lexer import (
+    classify_plain, COBLOOM_AT_END, CO_START,
+    TITLE, SUBTITLE, CODE, CO, UNIT, PART, QNUM, TEXT,
+)
 
 
-def extract_text_from_pdf(pdf_path):
-    if not os.path.exists(pdf_path):
-        raise FileNotFoundError(f"PDF not found: {pdf_path}")
-    reader = PdfReader(pdf_path)
-    text = ""
-    for page in reader.pages:
+def _iter_page_range(reader, start, stop):
+    for page in reader.pages[start:stop]:
         page_text = page.extract_text()
         if page_text:
-            text += page_text + "\n"
-    return text
+            yield page_text + "\n"
+
+
+def _extract_page_range(source, start, stop):
+    return "".join(_iter_page_range(PdfReader(pdf_stream(source)), start, stop))
+
+
+def iter_page_texts(pdf_path, workers=None):
+    # Yields page text in order; in parallel mode one chunk per page range.
+    # pdf_path may also be the PDF's bytes or a binary file object.
+    source = pdf_data(pdf_path)
+    if not isinstance(source, bytes) and not os.path.exists(source):
+        raise FileNotFoundError(f"PDF not found: {source}")
+    reader = PdfReader(pdf_stream(source))
+    page_count = len(reader.pages)
+    workers = resolve_workers(page_count, workers)
+    if workers == 1:
+        yield from _iter_page_range(reader, 0, page_count)
+    else:
+        yield from map_page_ranges(_extract_page_range, source, page_count, workers)
+
+
+def extract_text_from_pdf(pdf_path, workers=None):
+    return "".join(iter_page_texts(pdf_path, workers))
+
+
+class LineStructurer:
+    # Classifies raw bank lines into the (style, text) blocks of the plain
+    # structured layout, one line at a time. Shared by the PDF render and
+    # the direct extractor.
+    def __init__(self):
+        self.current_question_lines = []
+        self.current_qnum = None
+
+    def _flush_body(self, blocks):
+        blocks.append(("QuestionBody", " ".join(self.current_question_lines).strip()))
+
+    def feed(self, line):
+        blocks = []
+        kind, m = classify_plain(line)
+        # Header
+        if kind == TITLE:
+            blocks.append(("MainTitle", line))
+        elif kind in (SUBTITLE, CODE):
+            blocks.append(("SubTitle", line))
+        elif kind == CO:
+            blocks.append(("CourseOutcome", line))
+        # Unit / Part
+        elif kind in (UNIT, PART):
+            if self.current_qnum:
+                self._flush_body(blocks)
+                self.current_question_lines = []
+                self.current_qnum = None
+            blocks.append(("UnitHeading" if kind == UNIT else "PartHeading", line))
+        # Question number
+        elif kind == QNUM:
+            if self.current_qnum:
+                self._flush_body(blocks)
+            self.current_qnum = m.group("qnum_digits") + "."
+            blocks.append(("QuestionNum", self.current_qnum))
+            remaining = m.group("qnum_rest").strip()
+            self.current_question_lines = [remaining] if remaining else []
+        # Collect line for current question (table headers are skipped)
+        elif kind == TEXT and self.current_qnum:
+            stripped = line.strip()
+            # Check for CO Bloom at end of line
+            cobloom_match = COBLOOM_AT_END.search(stripped)
+            if cobloom_match:
+                main_part = stripped[: cobloom_match.start()].strip()
+                if main_part:
+                    self.current_question_lines.append(main_part)
+                self._flush_body(blocks)
+                # Uniformly place CO Bloom after question on new line
+                blocks.append(("COBloom", f"{cobloom_match.group(1)} {cobloom_match.group(2)}"))
+                self.current_question_lines = []
+                self.current_qnum = None
+            else:
+                self.current_question_lines.append(stripped)
+        return blocks
+
+    def close(self):
+        blocks = []
+        # Last question
+        if self.current_qnum and self.current_question_lines:
+            self._flush_body(blocks)
+        return blocks
+
+
+def structure_lines(lines):
+    structurer = LineStructurer()
+    for line in lines:
+        yield from structurer.feed(line)
+    yield from structurer.close()
+
+
+# Spacers (before, after) around each block of the structured layout
+BLOCK_SPACING = {
+    "MainTitle": (0, 12),
+    "SubTitle": (0, 12),
+    "CourseOutcome": (0, 6),
+    "UnitHeading": (20, 15),
+    "PartHeading": (20, 12),
+}
 
 
 def create_plain_text_structured_pdf(input_pdf, output_path):
@@ -70,103 +172,14 @@ def create_plain_text_structured_pdf(input_pdf, output_path):
                 )
             )
     story = []
-    i = 0
-    current_question_lines = []
-    current_qnum = None
-    while i < len(lines):
-        line = lines[i]
-        # Header
-        if any(
-            k in line.upper()
-            for k in [
-                "TEST",
-                "REGULATIONS",
-                "DEPARTMENT",
-                "SEMESTER",
-                "COURSE OUTCOMES",
-            ]
-        ):
-            style = "MainTitle" if "TEST" in line.upper() else "SubTitle"
-            story.append(Paragraph(line, styles[style]))
-            story.append(Spacer(1, 12))
-            i += 1
-            continue
-        if re.match(r"^\d{4}[A-Z]{3}\d{3}T", line):
-            story.append(Paragraph(line, styles["SubTitle"]))
-            story.append(Spacer(1, 12))
-            i += 1
-            continue
-        if line.startswith("CO") and ":" in line:
-            story.append(Paragraph(line, styles["SubTitle"]))
-            story.append(Spacer(1, 6))
-            i += 1
-            continue
-        # Unit
-        if re.search(r"UNIT\s*[-–]?\s*[IVX12345]+", line, re.I):
-            if current_qnum:
-                full_text = " ".join(current_question_lines).strip()
-                story.append(Paragraph(full_text, styles["QuestionBody"]))
-                current_question_lines = []
-                current_qnum = None
-            story.append(Spacer(1, 20))
-            story.append(Paragraph(line, styles["UnitHeading"]))
-            story.append(Spacer(1, 15))
-            i += 1
-            continue
-        # Part
-        if line.upper().startswith("PART"):
-            if current_qnum:
-                full_text = " ".join(current_question_lines).strip()
-                story.append(Paragraph(full_text, styles["QuestionBody"]))
-                current_question_lines = []
-                current_qnum = None
-            story.append(Spacer(1, 20))
-            story.append(Paragraph(line, styles["PartHeading"]))
-            story.append(Spacer(1, 12))
-            i += 1
-            continue
-        # Skip table headers
-        if any(
-            h in line.upper()
-            for h in ["Q.NO", "QNO", "QUESTIONS", "CO'S", "BLOOM", "LEVEL"]
-        ):
-            i += 1
-            continue
-        # Question number
-        qnum_match = re.match(r"^(\d+)[\.\s]*(.*)", line)
-        if qnum_match:
-            if current_qnum:
-                full_text = " ".join(current_question_lines).strip()
-                story.append(Paragraph(full_text, styles["QuestionBody"]))
-            current_qnum = qnum_match.group(1) + "."
-            story.append(Paragraph(current_qnum, styles["QuestionNum"]))
-            remaining = qnum_match.group(2).strip()
-            current_question_lines = [remaining] if remaining else []
-            i += 1
-            continue
-        # Collect line for current question
-        if current_qnum:
-            stripped = line.strip()
-            # Check for CO Bloom at end of line
-            cobloom_match = re.search(r"(CO\d+)\s*(K\d+)$", stripped)
-            if cobloom_match:
-                main_part = stripped[: cobloom_match.start()].strip()
-                if main_part:
-                    current_question_lines.append(main_part)
-                full_text = " ".join(current_question_lines).strip()
-                story.append(Paragraph(full_text, styles["QuestionBody"]))
-                # Uniformly place CO Bloom after question on new line
-                cobloom_text = f"{cobloom_match.group(1)} {cobloom_match.group(2)}"
-                story.append(Paragraph(cobloom_text, styles["COBloom"]))
-                current_question_lines = []
-                current_qnum = None
-            else:
-                current_question_lines.append(stripped)
-        i += 1
-    # Last question
-    if current_qnum and current_question_lines:
-        full_text = " ".join(current_question_lines).strip()
-        story.append(Paragraph(full_text, styles["QuestionBody"]))
+    for style, text in structure_lines(lines):
+        before, after = BLOCK_SPACING.get(style, (0, 0))
+        if before:
+            story.append(Spacer(1, before))
+        # Course outcomes share the subtitle look, only the spacing differs
+        story.append(Paragraph(text, styles["SubTitle" if style == "CourseOutcome" else style]))
+        if after:
+            story.append(Spacer(1, after))
     
     doc.build(story)
     print(f"Clean structured PDF created: {output_path}")
@@ -176,7 +189,11 @@ def create_plain_text_structured_pdf(input_pdf, output_path):
 
 def course_outcomes(input_pdf):
     raw_text = extract_text_from_pdf(input_pdf)
-    lines = [line.strip() for line in raw_text.split("\n") if line.strip()]
+    return course_outcomes_from_lines(raw_text.split("\n"))
+
+
+def course_outcomes_from_lines(lines):
+    lines = [line.strip() for line in lines if line.strip()]
     
     course_outcomes = []
     co_mode = False
@@ -185,13 +202,13 @@ def course_outcomes(input_pdf):
     for line in lines:
         line_stripped = line.strip()
         
-        if re.match(r"^CO[1-5]:", line_stripped):
+        if CO_START.match(line_stripped):
             if co_mode and current_co:
                 course_outcomes.append(current_co.strip())
             co_mode = True
             current_co = line_stripped
         elif co_mode:
-            if re.match(r"^CO[1-5]:", line_stripped):
+            if CO_START.match(line_stripped):
                 course_outcomes.append(current_co.strip())
                 current_co = line_stripped
             elif line_stripped and not line_stripped.upper().startswith("UNIT") and "PART" not in line_stripped.upper():
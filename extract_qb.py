@@ -1,16 +1,57 @@
+import io
 import pdfplumber
 import re
 from question import Question
+from parallel_pages import resolve_workers, map_page_ranges
+from pdf_source import pdf_data, pdf_stream
+from line_lexer import classify_question_line, CO_BLOOM, CO_START, SUBJECT, UNIT, PART, QNUM, TEXT
+from extract_gen_plain_qb import (
+    iter_page_texts as iter_plain_page_texts,
+    LineStructurer,
+)
 
+# Bump whenever parsing changes what extract_bank returns; it is part of
+# the bank cache key, so stale cached parses are never served.
+PARSER_VERSION = 2
 
-def extract_text_from_pdf(pdf_path):
-    text = ""
-    with pdfplumber.open(pdf_path) as pdf:
+UNIT_MAP = {"I": 1, "II": 2, "III": 3, "IV": 4, "V": 5}
+
+
+def _iter_page_range(source, start, stop):
+    with pdfplumber.open(pdf_stream(source), pages=range(start + 1, stop + 1)) as pdf:
         for page in pdf.pages:
             page_text = page.extract_text(layout=True, x_tolerance=3, y_tolerance=3)
+            # Drop pdfminer's per-page object cache so memory stays flat
+            page.close()
             if page_text:
-                text += page_text + "\n"
-    return text
+                yield page_text + "\n"
+
+
+def _extract_page_range(source, start, stop):
+    return "".join(_iter_page_range(source, start, stop))
+
+
+def iter_page_texts(pdf_path, workers=None):
+    # workers=None uses every core for large files; small files stay serial.
+    # pdf_path may also be the PDF's bytes or a binary file object.
+    source = pdf_data(pdf_path)
+    with pdfplumber.open(pdf_stream(source)) as pdf:
+        page_count = len(pdf.pages)
+    workers = resolve_workers(page_count, workers)
+    if workers == 1:
+        yield from _iter_page_range(source, 0, page_count)
+    else:
+        yield from map_page_ranges(_extract_page_range, source, page_count, workers)
+
+
+def extract_text_from_pdf(pdf_path, workers=None):
+    return "".join(iter_page_texts(pdf_path, workers))
+
+
+def iter_lines(page_texts):
+    # Page-sized chunks in, lines out; never holds more than one page of text
+    for page_text in page_texts:
+        yield from page_text.split("\n")
 
 
 def extract_header(text):
@@ -61,53 +102,32 @@ def extract_questions(text):
     current_part = None
     collecting = False
     q_text_lines = []
-    lines = text.split("\n")
-    for original_line in lines:
+    for original_line in io.StringIO(text):
         line = original_line.strip()
-        # Detect unit
-        unit_match = re.match(r"Unit\s*[–-]?\s*(I{1,5}|IV|V)\b", line, re.IGNORECASE)
-        if unit_match:
+        kind, m = classify_question_line(line)
+        # Detect unit / part
+        if kind in (UNIT, PART):
             if collecting:
                 questions = flush_question(
                     questions, current_unit, current_part, q_text_lines
                 )
                 collecting = False
                 q_text_lines = []
-            roman = unit_match.group(1).upper()
-            unit_map = {"I": 1, "II": 2, "III": 3, "IV": 4, "V": 5}
-            current_unit = unit_map.get(roman)
-            continue
-        # Detect part
-        part_match = re.match(r"PART\s*[–-]?\s*([A-C])\b", line, re.IGNORECASE)
-        if part_match:
-            if collecting:
-                questions = flush_question(
-                    questions, current_unit, current_part, q_text_lines
-                )
-                collecting = False
-                q_text_lines = []
-            current_part = part_match.group(1).upper()
-            continue
-        # Skip irrelevant lines
-        if (
-            not line
-            or re.match(r"CO\d+:", line)
-            or re.match(r"Q.NO|QUESTIONS|CO’S|BLOOM|LEVEL", line, re.IGNORECASE)
-        ):
-            continue
+            if kind == UNIT:
+                current_unit = UNIT_MAP.get(m.group("roman").upper())
+            else:
+                current_part = m.group("letter").upper()
         # Start new question
-        start_match = re.match(r"^(\d{1,2})\.\s*(.*)$", line)
-        if start_match:
+        elif kind == QNUM:
             if collecting:
                 questions = flush_question(
                     questions, current_unit, current_part, q_text_lines
                 )
-            remaining_text = start_match.group(2).strip()
+            remaining_text = m.group("rest").strip()
             q_text_lines = [remaining_text] if remaining_text else []
             collecting = True
-            continue
-        # If collecting, append the line
-        if collecting and line:
+        # If collecting, append the line (blank and table-header lines are skipped)
+        elif kind == TEXT and collecting:
             q_text_lines.append(line)
     # Flush the last question
     if collecting:
@@ -116,19 +136,235 @@ def extract_questions(text):
 
 
 def flush_question(questions, unit, part, lines):
+    question = build_question(unit, part, lines)
+    if question is not None:
+        questions.append(question)
+    return questions
+
+
+def build_question(unit, part, lines):
     if not lines or not unit or not part:
-        return questions
+        return None
     text = " ".join(lines).strip()
     # Extract COx Kx
-    cb_match = re.search(r"CO(\d+)\s+K(\d+)(?:\s*Q\.)?", text, re.IGNORECASE)
+    cb_match = CO_BLOOM.search(text)
     if cb_match:
         co = f"CO{cb_match.group(1)}"
         bloom = f"K{cb_match.group(2)}"
         text = text[: cb_match.start()].strip()
     else:
-        return questions  # Skip if no CO/Bloom
-    questions.append(Question(unit=unit, part=part, text=text, co=co, bloom=bloom))
-    return questions
+        return None  # Skip if no CO/Bloom
+    return Question(unit=unit, part=part, text=text, co=co, bloom=bloom)
+
+
+class BankParser:
+    # Streaming state machine that fills the header, the course outcomes and
+    # the questions in one linear pass over the raw bank lines. Raw lines go
+    # through the plain-layout LineStructurer first, so questions and header
+    # come out exactly as the old plain.pdf re-parse produced them. Header and
+    # CO scanning stop at the first Unit/PART heading.
+    def __init__(self):
+        self.header = {
+            "exam_type": None,
+            "subject_code": None,
+            "subject_name": None,
+            "regulation": None,
+            "department": None,
+            "semester": None,
+        }
+        self.course_outcomes = []
+        self._structurer = LineStructurer()
+        # Header state
+        self._in_header = True
+        self._subject_open = False
+        # Course outcome state (runs on the raw lines)
+        self._co_mode = False
+        self._co_done = False
+        self._current_co = ""
+        # Question state
+        self._unit = None
+        self._part = None
+        self._collecting = False
+        self._q_lines = []
+
+    def feed(self, raw_line):
+        # Returns the questions completed by this line
+        line = raw_line.strip()
+        if not line:
+            return []
+        if not self._co_done:
+            self._feed_co(line)
+        completed = []
+        for style, block in self._structurer.feed(raw_line):
+            self._feed_block(style, block, completed)
+        return completed
+
+    def close(self):
+        completed = []
+        for style, block in self._structurer.close():
+            self._feed_block(style, block, completed)
+        if self._collecting:
+            self._flush(completed)
+        self._subject_open = False
+        self._end_cos()
+        return completed
+
+    def snapshot(self):
+        # Everything the next line's parse depends on, as plain tuples so it
+        # can be hashed and stored as JSON. Once header and CO scanning are
+        # over they cannot change again, so they drop out of the snapshot and
+        # equal question context compares equal whatever the header says.
+        scan = None
+        if self._in_header or not self._co_done:
+            scan = (
+                tuple(self.header.items()),
+                tuple(self.course_outcomes),
+                self._in_header,
+                self._subject_open,
+                self._co_mode,
+                self._co_done,
+                self._current_co,
+            )
+        return (
+            self._structurer.current_qnum,
+            tuple(self._structurer.current_question_lines),
+            self._unit,
+            self._part,
+            self._collecting,
+            tuple(self._q_lines),
+            scan,
+        )
+
+    def restore(self, state):
+        # Accepts snapshot() output, also after a JSON round trip
+        qnum, qnum_lines, unit, part, collecting, q_lines, scan = state
+        self._structurer.current_qnum = qnum
+        self._structurer.current_question_lines = list(qnum_lines)
+        self._unit = unit
+        self._part = part
+        self._collecting = collecting
+        self._q_lines = list(q_lines)
+        if scan is None:
+            self._in_header = False
+            self._subject_open = False
+            self._co_mode = False
+            self._co_done = True
+            return
+        header, cos, self._in_header, self._subject_open, self._co_mode, self._co_done, self._current_co = scan
+        self.header = dict(header)
+        self.course_outcomes = list(cos)
+
+    def _end_cos(self):
+        if self._co_mode and self._current_co:
+            self.course_outcomes.append(self._current_co.strip())
+        self._co_mode = False
+        self._co_done = True
+
+    def _feed_co(self, line):
+        if CO_START.match(line):
+            if self._co_mode and self._current_co:
+                self.course_outcomes.append(self._current_co.strip())
+            self._co_mode = True
+            self._current_co = line
+        elif self._co_mode:
+            if not line.upper().startswith("UNIT") and "PART" not in line.upper():
+                self._current_co += " " + line
+            else:
+                self._end_cos()
+
+    def _feed_block(self, style, block, completed):
+        line = block.strip()
+        if self._in_header:
+            if style in ("UnitHeading", "PartHeading"):
+                self._in_header = False
+                self._subject_open = False
+                self._end_cos()
+            elif line:
+                self._feed_header(line)
+        self._feed_question(line, completed)
+
+    def _feed_header(self, line):
+        header = self.header
+        # Subject name continues until a CO line or a Unit/PART marker
+        if self._subject_open:
+            if CO_START.match(line) or "Unit" in line or "PART" in line.upper():
+                self._subject_open = False
+            else:
+                header["subject_name"] = f"{header['subject_name']} {line}"
+        if "CONTINUOUS ASSESSMENT TEST" in line.upper():
+            header["exam_type"] = line
+        if "Regulations R" in line:
+            header["regulation"] = line
+        if "Department" in line:
+            header["department"] = line
+        if "Year" in line and "Semester" in line:
+            header["semester"] = line
+        # Subject Code + Name
+        subj_match = SUBJECT.search(line)
+        if subj_match:
+            header["subject_code"] = subj_match.group(1)
+            header["subject_name"] = subj_match.group(2).strip()
+            self._subject_open = True
+
+    def _flush(self, completed):
+        question = build_question(self._unit, self._part, self._q_lines)
+        if question is not None:
+            completed.append(question)
+        self._collecting = False
+        self._q_lines = []
+
+    def _feed_question(self, line, completed):
+        kind, m = classify_question_line(line)
+        # Detect unit / part
+        if kind in (UNIT, PART):
+            if self._collecting:
+                self._flush(completed)
+            if kind == UNIT:
+                self._unit = UNIT_MAP.get(m.group("roman").upper())
+            else:
+                self._part = m.group("letter").upper()
+        # Start new question
+        elif kind == QNUM:
+            if self._collecting:
+                self._flush(completed)
+            remaining_text = m.group("rest").strip()
+            self._q_lines = [remaining_text] if remaining_text else []
+            self._collecting = True
+        # If collecting, append the line (blank and table-header lines are skipped)
+        elif kind == TEXT and self._collecting:
+            self._q_lines.append(line)
+
+
+def iter_questions(lines, parser=None):
+    # Yields each Question as soon as its last line has been seen. Pass a
+    # BankParser to read header/course outcomes once the stream is consumed.
+    parser = parser or BankParser()
+    for line in lines:
+        yield from parser.feed(line)
+    yield from parser.close()
+
+
+def stream_bank(pdf_path, workers=None):
+    # pages → lines → questions, all lazy. Returns the parser (header and
+    # course outcomes fill in as the stream advances) and the question stream.
+    parser = BankParser()
+    lines = iter_lines(iter_plain_page_texts(pdf_path, workers))
+    return parser, iter_questions(lines, parser)
+
+
+def parse_bank(lines):
+    parser = BankParser()
+    questions = list(iter_questions(lines, parser))
+    return parser.header, questions, parser.course_outcomes
+
+
+def extract_bank(pdf_path, workers=None):
+    # Direct path: one pypdf parse of the uploaded bank, one pass of
+    # BankParser over its lines. Produces what the old plain.pdf render +
+    # pdfplumber re-parse produced, without the round trip.
+    parser, questions = stream_bank(pdf_path, workers)
+    questions = list(questions)
+    return parser.header, questions, parser.course_outcomes
 
 
 
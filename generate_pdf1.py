@@ -1,5 +1,6 @@
 # generate_pdf.py
 import hashlib
+import io
 import time
 _real_md5 = hashlib.md5
 def safe_md5(*args, **kwargs):
@@ -12,25 +13,33 @@ from reportlab.lib.utils import ImageReader
 from reportlab.lib.colors import black
 from reportlab.platypus import Table, TableStyle
 import datetime  # For timestamp in filename
+from functools import lru_cache
+from layout import DESCENT, Block, draw_pages, paginate, spacer, wrap_lines
 
 def wrap_text(text, c, max_width, font="Times-Roman", font_size=11):
-    words = text.split()
-    lines = []
-    current = ""
-    for word in words:
-        test = current + word + " "
-        if c.stringWidth(test, font, font_size) <= max_width:
-            current = test
-        else:
-            if current:
-                lines.append(current.strip())
-            current = word + " "
-    if current:
-        lines.append(current.strip())
-    return lines
-
-def generate_pdf(header, selected_questions, branch, qcode, output_path, cos, month_year, exam_type="cat1"):
-    c = canvas.Canvas(output_path, pagesize=A4)
+    # c is kept for callers; widths come from layout's per-font cache
+    return list(wrap_lines(text, max_width, font, font_size))
+
+@lru_cache(maxsize=None)
+def _bloom_table(avail_width):
+    # Same on every page of every version: built, styled and wrapped once
+    bloom_data = [
+        ["K1-Remember", "K2-Understand", "K3-Apply", "K4-Analyse", "K5-Evaluate", "K6-Create"]
+    ]
+    bloom_table = Table(bloom_data, colWidths=avail_width/6)
+    bloom_table.setStyle(TableStyle([
+        ('BACKGROUND', (0,0), (-1,0), '#FFFFFF'),  
+        ('TEXTCOLOR', (0, 0), (-1, 0), black),
+        ('ALIGN', (0,0), (-1,-1), 'CENTER'),
+        ('FONTNAME', (0,0), (-1,0), 'Times-Bold'),
+        ('FONTSIZE', (0,0), (-1,0), 10),
+        ('GRID', (0,0), (-1,-1), 1, black),
+    ]))
+    w, h = bloom_table.wrap(avail_width, A4[1])
+    return bloom_table, h
+
+
+def _draw_cat_header(c, header, branch, qcode, cos, month_year, exam_type):
     width, height = A4
     margin = 60
     x_left = margin
@@ -119,167 +128,14 @@ def generate_pdf(header, selected_questions, branch, qcode, output_path, cos, mo
     y -= 15
 
     # Bloom's Taxonomy Table
-    bloom_data = [
-        ["K1-Remember", "K2-Understand", "K3-Apply", "K4-Analyse", "K5-Evaluate", "K6-Create"]
-    ]
-    bloom_table = Table(bloom_data, colWidths=(width - 2*margin)/6)
-    bloom_table.setStyle(TableStyle([
-        ('BACKGROUND', (0,0), (-1,0), '#FFFFFF'),  
-        ('TEXTCOLOR', (0, 0), (-1, 0), black),
-        ('ALIGN', (0,0), (-1,-1), 'CENTER'),
-        ('FONTNAME', (0,0), (-1,0), 'Times-Bold'),
-        ('FONTSIZE', (0,0), (-1,0), 10),
-        ('GRID', (0,0), (-1,-1), 1, black),
-    ]))
-    w, h = bloom_table.wrap(width - 2*margin, y)
+    bloom_table, h = _bloom_table(width - 2*margin)
     bloom_table.drawOn(c, margin, y - h)
     y -= 10
     y -= h + 30
+    return y
 
-    # PART A - Ensure heading and first question on same page
-    c.setFont("Times-Bold", 14)
-    c.drawCentredString(width / 2, y, "PART A – (5 x 2 = 10 marks)")
-    y -= 25
-    c.setFont("Times-Bold", 12)
-    c.drawCentredString(width / 2, y, "Answer ALL Questions")
-    y -= 30  # Space before questions
-
-    # Check space for heading + first question
-    if y < 50:  # Safe threshold
-        c.showPage()
-        y = height - 60
-        c.setFont("Times-Roman", 11)
-
-    c.setFont("Times-Roman", 11)
-    q_no = 1
-    for q in selected_questions["PART_A"]:
-        wrapped = wrap_text(q.text, c, x_right - x_left - 80)
-        c.drawString(x_left, y, f"{q_no}. {wrapped[0]}")
-        y -= 15
-        for line in wrapped[1:]:
-            c.drawString(x_left + 20, y, line)
-            y -= 20
-        c.drawRightString(x_right, y + 15, f"{q.co} {q.bloom}")
-        y -= 10
-        q_no += 1
-
-    if y < 200:  # Safe threshold
-        c.showPage()
-        y = height - 60
-        c.setFont("Times-Roman", 11)
-
-    
-    # PART B - Ensure heading and first question on same page
-    c.setFont("Times-Bold", 14)
-    c.drawCentredString(width / 2, y, "PART B – (2 x 13 = 26 marks)")
-    y -= 25
-    c.setFont("Times-Bold", 12)
-    c.drawCentredString(width / 2, y, "Answer ALL Questions")
-    y -= 30
-
-    # Check space for heading + first OR pair
-    if y < 100:  # Enough for one full OR pair
-        c.showPage()
-        y = height - 60
-        c.setFont("Times-Roman", 11)
-
-    c.setFont("Times-Roman", 11)
-    for idx, pair in enumerate(selected_questions["PART_B"], start=6):
-        main = pair["main"]
-        or_q = pair["or"]
-
-        # Check space for full OR pair
-        if y < 250:
-            c.showPage()
-            y = height - 60
-            c.setFont("Times-Roman", 11)
-
-        # Main question
-        wrapped = wrap_text(main.text, c, x_right - x_left - 80)
-        c.drawString(x_left, y, f"{idx}. {wrapped[0]}")
-        y -= 15
-        for line in wrapped[1:]:
-            c.drawString(x_left + 25, y, line)
-            y -= 15
-        c.drawRightString(x_right, y + 15, f"{main.co} {main.bloom}")
-        y -= 15
-
-        # (OR)
-        c.setFont("Times-Italic", 12)
-        c.drawCentredString(width / 2, y, "(OR)")
-        y -= 20
-
-        # OR question
-        c.setFont("Times-Roman", 11)
-        wrapped_or = wrap_text(or_q.text, c, x_right - x_left - 100)
-        c.drawString(x_left + 10, y, wrapped_or[0])
-        y -= 15
-        for line in wrapped_or[1:]:
-            c.drawString(x_left + 25, y, line)
-            y -= 15
-        c.drawRightString(x_right, y + 15, f"{or_q.co} {or_q.bloom}")
-        y -= 30
-    
-    if y < 100:  # Safe threshold
-        c.showPage()
-        y = height - 60
-        c.setFont("Times-Roman", 11)
-
-    # PART C - Ensure heading and first question on same page, proper alignment
-    c.setFont("Times-Bold", 14)
-    c.drawCentredString(width / 2, y, "PART C – (1 x 14 = 14 marks)")
-    y -= 25
-    c.setFont("Times-Bold", 12)
-    c.drawCentredString(width / 2, y, "Answer ALL Questions")
-    y -= 30
-
-    # Check space for heading + first question
-    if y < 200:
-        c.showPage()
-        y = height - 60
-        c.setFont("Times-Roman", 11)
-
-    c.setFont("Times-Roman", 11)
-    part_c_qs = selected_questions["PART_C"]
-    q_no = 10 if exam_type in ["cat1", "cat2"] else 16  # Adjust for endsem if needed
-
-    for i, q in enumerate(part_c_qs):
-        if y < 150:
-            c.showPage()
-            y = height - 60
-            c.setFont("Times-Roman", 11)
-
-        wrapped = wrap_text(q.text, c, x_right - x_left - 80)
-        if i == 0:
-            # First question: full number and alignment like others
-            c.drawString(x_left, y, f"{q_no}. (a) {wrapped[0]}")
-        else:
-            # OR question: indented, no number prefix
-            c.drawString(x_left + 15, y, "(b) "+wrapped[0])
-
-        y -= 15
-        for line in wrapped[1:]:
-            indent = 30 if i == 0 else 30
-            c.drawString(x_left + indent, y, line)
-            y -= 15
-
-        c.drawRightString(x_right, y + 15, f"{q.co} {q.bloom}")
-        y -= 25
-
-        if i == 0 and len(part_c_qs) > 1:
-            c.setFont("Times-Italic", 12)
-            c.drawCentredString(width / 2, y, "(OR)")
-            y -= 20
-            c.setFont("Times-Roman", 11)
-
-    # Generate unique filename with timestamp (outside function if needed, but here for completeness)
-    current_time = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
-    # Note: output_path is already provided, so no change here
-    c.save()
-    
 
-def generate_pdf_endsem(header, selected_questions, branch, qcode, output_path, cos, month_year, tallow, exam_type="endsem"):
-    c = canvas.Canvas(output_path, pagesize=A4)
+def _draw_endsem_header(c, header, branch, qcode, cos, month_year, tallow):
     width, height = A4
     margin = 60
     x_left = margin
@@ -376,156 +232,174 @@ def generate_pdf_endsem(header, selected_questions, branch, qcode, output_path,
     y -= 5
 
     # Bloom's Taxonomy Table
-    bloom_data = [
-        ["K1-Remember", "K2-Understand", "K3-Apply", "K4-Analyse", "K5-Evaluate", "K6-Create"]
-    ]
-    bloom_table = Table(bloom_data, colWidths=(width - 2*margin)/6)
-    bloom_table.setStyle(TableStyle([
-        ('BACKGROUND', (0,0), (-1,0), '#FFFFFF'),  # Changed to black for visibility if needed, but typically light
-        ('TEXTCOLOR', (0, 0), (-1, 0), black),
-        ('ALIGN', (0,0), (-1,-1), 'CENTER'),
-        ('FONTNAME', (0,0), (-1,0), 'Times-Bold'),
-        ('FONTSIZE', (0,0), (-1,0), 10),
-        ('GRID', (0,0), (-1,-1), 1, black),
-    ]))
-    w, h = bloom_table.wrap(width - 2*margin, y)
+    bloom_table, h = _bloom_table(width - 2*margin)
     bloom_table.drawOn(c, margin, y - h)
     y -= 10
     y -= h + 30
+    return y
 
-    # PART A - Ensure heading and first question on same page
-    c.setFont("Times-Bold", 14)
-    c.drawCentredString(width / 2, y, "PART A – (10 x 2 = 20 marks)")
-    y -= 25
-    c.setFont("Times-Bold", 12)
-    c.drawCentredString(width / 2, y, "Answer ALL Questions")
-    y -= 25  # Space before questions
 
-    # Check space for heading + first question
-    if y < 50:  # Safe threshold
-        c.showPage()
-        y = height - 60
-        c.setFont("Times-Roman", 11)
+# y below each header form, by form name
+_header_y = {}
 
-    c.setFont("Times-Roman", 11)
-    q_no = 1
-    for q in selected_questions["PART_A"]:
-        wrapped = wrap_text(q.text, c, x_right - x_left - 80)
-        c.drawString(x_left, y, f"{q_no}. {wrapped[0]}")
-        y -= 15
-        for line in wrapped[1:]:
-            c.drawString(x_left + 20, y, line)
-            y -= 15
-        c.drawRightString(x_right, y + 15, f"{q.co} {q.bloom}")
-        y -= 5
-        q_no += 1
 
-    y -= 20
-    c.showPage()
-    y = height - 60
-    
-    # PART B - Ensure heading and first question on same page
-    c.setFont("Times-Bold", 14)
-    c.drawCentredString(width / 2, y, "PART B – (5 x 13 = 65 marks)")
-    y -= 25
-    c.setFont("Times-Bold", 12)
-    c.drawCentredString(width / 2, y, "Answer ALL Questions")
-    y -= 30
+def _stamp_header(c, draw, *args):
+    # The header of a paper (Reg. No. boxes, code box, titles, course outcomes,
+    # Bloom table) is drawn once per document as a form XObject; every version
+    # in the document only references it. Returns y below the header.
+    name = "Header" + hashlib.blake2b(repr((draw.__name__,) + args).encode("utf-8"), digest_size=8).hexdigest()
+    if not c.hasForm(name):
+        c.beginForm(name)
+        _header_y[name] = draw(c, *args)
+        c.endForm()
+    c.doForm(name)
+    return _header_y[name]
 
-    # Check space for heading + first OR pair
-    if y < 100:  # Enough for one full OR pair
-        c.showPage()
-        y = height - 60
+
+# Question sections are built as blocks measured from their wrapped lines,
+# then paginated (layout.paginate): a question or OR pair is never split and
+# a part heading always starts on the page of its first question.
+PAGE_TOP = A4[1] - 60
+PAGE_BOTTOM = 50
+X_LEFT = 60
+X_RIGHT = A4[0] - 60
+
+
+def _heading_block(title, space_after):
+    def draw(c, y):
+        c.setFont("Times-Bold", 14)
+        c.drawCentredString(A4[0] / 2, y, title)
+        c.setFont("Times-Bold", 12)
+        c.drawCentredString(A4[0] / 2, y - 25, "Answer ALL Questions")
+    return Block(25 + space_after, 25 + DESCENT, draw, keep_with_next=True)
+
+
+def _part_a_block(q_no, q, line_gap, space_after):
+    wrapped = wrap_lines(q.text, X_RIGHT - X_LEFT - 80)
+
+    def draw(c, y):
         c.setFont("Times-Roman", 11)
+        c.drawString(X_LEFT, y, f"{q_no}. {wrapped[0]}")
+        y -= 15
+        for line in wrapped[1:]:
+            c.drawString(X_LEFT + 20, y, line)
+            y -= line_gap
+        c.drawRightString(X_RIGHT, y + 15, f"{q.co} {q.bloom}")
+    last = line_gap * (len(wrapped) - 1)
+    return Block(15 + last + space_after, max(last, 15 + last - line_gap) + DESCENT, draw)
 
-    c.setFont("Times-Roman", 11)
-    for idx, pair in enumerate(selected_questions["PART_B"], start=6):
-        main = pair["main"]
-        or_q = pair["or"]
-
-        # Check space for full OR pair
-        if y < 250:
-            c.showPage()
-            y = height - 60
-            c.setFont("Times-Roman", 11)
 
+def _or_pair_block(idx, pair):
+    main = pair["main"]
+    or_q = pair["or"]
+    main_label, or_label = pair["labels"]
+    wrapped = wrap_lines(f"{main_label} {main.text.strip()}", X_RIGHT - X_LEFT - 80)
+    wrapped_or = wrap_lines(f"{or_label} {or_q.text.strip()}", X_RIGHT - X_LEFT - 100)
+
+    def draw(c, y):
         # Main question
-        wrapped = wrap_text(main.text, c, x_right - x_left - 80)
-        c.drawString(x_left, y, f"{idx}. {wrapped[0]}")
+        c.setFont("Times-Roman", 11)
+        c.drawString(X_LEFT, y, f"{idx}. {wrapped[0]}")
         y -= 15
         for line in wrapped[1:]:
-            c.drawString(x_left + 25, y, line)
+            c.drawString(X_LEFT + 25, y, line)
             y -= 15
-        c.drawRightString(x_right, y + 15, f"{main.co} {main.bloom}")
+        c.drawRightString(X_RIGHT, y + 15, f"{main.co} {main.bloom}")
         y -= 15
 
         # (OR)
         c.setFont("Times-Italic", 12)
-        c.drawCentredString(width / 2, y, "(OR)")
+        c.drawCentredString(A4[0] / 2, y, "(OR)")
         y -= 20
 
         # OR question
         c.setFont("Times-Roman", 11)
-        wrapped_or = wrap_text(or_q.text, c, x_right - x_left - 100)
-        c.drawString(x_left + 10, y, wrapped_or[0])
+        c.drawString(X_LEFT + 10, y, wrapped_or[0])
         y -= 15
         for line in wrapped_or[1:]:
-            c.drawString(x_left + 25, y, line)
+            c.drawString(X_LEFT + 25, y, line)
             y -= 15
-        c.drawRightString(x_right, y + 15, f"{or_q.co} {or_q.bloom}")
-        y -= 30
-
-    # Check space for heading + first OR pair
-    if y < 100:  # Enough for one full OR pair
-        c.showPage()
-        y = height - 60
-        c.setFont("Times-Roman", 11)
-        
-    # PART C - Ensure heading and first question on same page, proper alignment
-    c.setFont("Times-Bold", 14)
-    c.drawCentredString(width / 2, y, "PART C – (1 x 15 = 15 marks)")
-    y -= 25
-    c.setFont("Times-Bold", 12)
-    c.drawCentredString(width / 2, y, "Answer ALL Questions")
-    y -= 30
+        c.drawRightString(X_RIGHT, y + 15, f"{or_q.co} {or_q.bloom}")
+    last = 15 * len(wrapped) + 15 + 20 + 15 * (len(wrapped_or) - 1)
+    return Block(last + 45, last + DESCENT, draw)
 
-    # Check space for heading + first question
-    if y < 200:
-        c.showPage()
-        y = height - 60
-        c.setFont("Times-Roman", 11)
 
-    c.setFont("Times-Roman", 11)
-    part_c_qs = selected_questions["PART_C"]
-    q_no = 16  # Adjust for endsem if needed
+def _part_c_block(q_no, part_c_qs):
+    # (a), (OR) and (b) stay on one page
+    wrapped = [wrap_lines(q.text, X_RIGHT - X_LEFT - 80) for q in part_c_qs]
 
-    for i, q in enumerate(part_c_qs):
-        if y < 150:
-            c.showPage()
-            y = height - 60
+    def draw(c, y):
+        for i, q in enumerate(part_c_qs):
             c.setFont("Times-Roman", 11)
-
-        wrapped = wrap_text(q.text, c, x_right - x_left - 80)
-        if i == 0:
-            # First question: full number and alignment like others
-            c.drawString(x_left, y, f"{q_no}. (a) {wrapped[0]}")
-        else:
-            # OR question: indented, no number prefix
-            c.drawString(x_left + 15, y, "(b) "+wrapped[0])
-
-        y -= 15
-        for line in wrapped[1:]:
-            indent = 30 if i == 0 else 30
-            c.drawString(x_left + indent, y, line)
+            if i == 0:
+                c.drawString(X_LEFT, y, f"{q_no}. (a) {wrapped[i][0]}")
+            else:
+                c.drawString(X_LEFT + 15, y, "(b) " + wrapped[i][0])
             y -= 15
+            for line in wrapped[i][1:]:
+                c.drawString(X_LEFT + 30, y, line)
+                y -= 15
+            c.drawRightString(X_RIGHT, y + 15, f"{q.co} {q.bloom}")
+            y -= 25
+
+            if i == 0 and len(part_c_qs) > 1:
+                c.setFont("Times-Italic", 12)
+                c.drawCentredString(A4[0] / 2, y, "(OR)")
+                y -= 20
+    height = sum(15 * len(lines) + 25 for lines in wrapped) + (20 if len(wrapped) > 1 else 0)
+    return Block(height, max(height - 40, 0) + DESCENT, draw)
+
+
+def generate_pdf(header, selected_questions, branch, qcode, output_path, cos, month_year, exam_type="cat1", c=None):
+    # output_path may be a path or a binary file object; with None the PDF's
+    # bytes are returned. Pass an open canvas as c to add this version to a
+    # multi-version file instead; the versions share one header form
+    own = c is None
+    if own:
+        buffer = io.BytesIO() if output_path is None else None
+        c = canvas.Canvas(output_path if buffer is None else buffer, pagesize=A4)
+    y = _stamp_header(c, _draw_cat_header, header, branch, qcode, tuple(cos), month_year, exam_type)
+
+    blocks = [_heading_block("PART A – (5 x 2 = 10 marks)", 30)]
+    blocks += [_part_a_block(q_no, q, 20, 10) for q_no, q in enumerate(selected_questions["PART_A"], start=1)]
+    blocks.append(_heading_block("PART B – (2 x 13 = 26 marks)", 30))
+    blocks += [_or_pair_block(idx, pair) for idx, pair in enumerate(selected_questions["PART_B"], start=6)]
+    blocks.append(_heading_block("PART C – (1 x 14 = 14 marks)", 30))
+    q_no = 10 if exam_type in ["cat1", "cat2"] else 16  # Adjust for endsem if needed
+    blocks.append(_part_c_block(q_no, selected_questions["PART_C"]))
+    draw_pages(c, paginate(blocks, y, PAGE_TOP, PAGE_BOTTOM))
 
-        c.drawRightString(x_right, y + 15, f"{q.co} {q.bloom}")
-        y -= 25
+    # Generate unique filename with timestamp (outside function if needed, but here for completeness)
+    current_time = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
+    # Note: output_path is already provided, so no change here
+    if own:
+        c.save()
+        if buffer is not None:
+            return buffer.getvalue()
+    else:
+        c.showPage()
+    
 
-        if i == 0 and len(part_c_qs) > 1:
-            c.setFont("Times-Italic", 12)
-            c.drawCentredString(width / 2, y, "(OR)")
-            y -= 20
-            c.setFont("Times-Roman", 11)
-            
-    c.save()
\ No newline at end of file
+def generate_pdf_endsem(header, selected_questions, branch, qcode, output_path, cos, month_year, tallow, exam_type="endsem", c=None):
+    # output_path and c as in generate_pdf
+    own = c is None
+    if own:
+        buffer = io.BytesIO() if output_path is None else None
+        c = canvas.Canvas(output_path if buffer is None else buffer, pagesize=A4)
+    y = _stamp_header(c, _draw_endsem_header, header, branch, qcode, tuple(cos), month_year, tallow)
+
+    blocks = [_heading_block("PART A – (10 x 2 = 20 marks)", 25)]
+    blocks += [_part_a_block(q_no, q, 15, 5) for q_no, q in enumerate(selected_questions["PART_A"], start=1)]
+    blocks.append(spacer(20))
+    blocks.append(_heading_block("PART B – (5 x 13 = 65 marks)", 30))
+    blocks += [_or_pair_block(idx, pair) for idx, pair in enumerate(selected_questions["PART_B"], start=6)]
+    blocks.append(_heading_block("PART C – (1 x 15 = 15 marks)", 30))
+    blocks.append(_part_c_block(16, selected_questions["PART_C"]))
+    draw_pages(c, paginate(blocks, y, PAGE_TOP, PAGE_BOTTOM))
+
+    if own:
+        c.save()
+        if buffer is not None:
+            return buffer.getvalue()
+    else:
+        c.showPage()
\ No newline at end of file
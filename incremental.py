@@ -0,0 +1,183 @@
+# incremental.py – page-level re-extraction for edited question banks
+#
+# Every page is fingerprinted from its content stream and resources. A page's
+# extracted text is stored under that fingerprint, together with the parse of
+# the page for each parser state it has been entered with (unit/part and any
+# question still open from the previous page). Re-uploading an edited bank
+# only re-extracts pages whose fingerprint changed, and only re-parses pages
+# whose content or incoming state changed.
+import hashlib
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from pypdf import PdfReader
+from pypdf.generic import IndirectObject, StreamObject
+
+from question import Question
+from extract_qb import BankParser, PARSER_VERSION
+from json_cache import JsonCache
+from parallel_pages import resolve_workers
+from pdf_source import pdf_data, pdf_stream
+
+PAGE_CACHE_DIR = os.environ.get(
+    "QPG_PAGE_CACHE_DIR",
+    os.path.join(os.path.expanduser("~"), ".cache", "question-paper-generator", "pages"),
+)
+MAX_PAGE_CACHE_BYTES = int(os.environ.get("QPG_PAGE_CACHE_MAX_BYTES", 128 * 1024 * 1024))
+
+# Parses kept per page; a page is normally entered with one state, two while
+# an edit on an earlier page is being revised
+MAX_PARSES_PER_PAGE = 4
+
+
+# Embedded font programs do not change the extracted text; their bytes (and
+# image samples) are left out of the fingerprint
+_UNHASHED = ("/FontFile", "/FontFile2", "/FontFile3")
+
+
+def _hash_object(h, obj, seen):
+    # Hashes obj with everything it references: form XObjects and their own
+    # resources, font encodings, ToUnicode maps, widths
+    if isinstance(obj, IndirectObject):
+        ref = (obj.idnum, obj.generation)
+        if ref in seen:
+            h.update(b"<seen>")
+            return
+        seen.add(ref)
+        obj = obj.get_object()
+    if isinstance(obj, dict):
+        h.update(b"<<")
+        for key in sorted(obj):
+            h.update(key.encode())
+            if key not in _UNHASHED:
+                _hash_object(h, obj.raw_get(key), seen)
+        h.update(b">>")
+        if isinstance(obj, StreamObject) and obj.get("/Subtype") != "/Image":
+            h.update(obj.get_data())
+    elif isinstance(obj, list):
+        h.update(b"[")
+        for item in obj:
+            _hash_object(h, item, seen)
+        h.update(b"]")
+    else:
+        h.update(repr(obj).encode())
+
+
+def page_fingerprint(page):
+    h = hashlib.sha256()
+    contents = page.get_contents()
+    if contents is not None:
+        h.update(contents.get_data())
+    h.update(str(page.get("/Rotate", 0)).encode())
+    resources = page.get("/Resources")
+    if resources is not None:
+        _hash_object(h, resources, set())
+    return h.hexdigest()
+
+
+def _page_text(page):
+    page_text = page.extract_text()
+    return page_text + "\n" if page_text else ""
+
+
+def _extract_pages(source, indices):
+    reader = PdfReader(pdf_stream(source))
+    return [_page_text(reader.pages[i]) for i in indices]
+
+
+def _state_key(state):
+    raw = json.dumps(state, ensure_ascii=False, separators=(",", ":"))
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+
+class PageStore(JsonCache):
+    def __init__(self, cache_dir=PAGE_CACHE_DIR, max_bytes=MAX_PAGE_CACHE_BYTES):
+        super().__init__(cache_dir, max_bytes)
+
+    def get(self, fingerprint):
+        return self.load(f"{fingerprint}-p{PARSER_VERSION}")
+
+    def put(self, fingerprint, record):
+        self.store(f"{fingerprint}-p{PARSER_VERSION}", record)
+
+
+_default_store = None
+
+
+def default_store():
+    global _default_store
+    if _default_store is None:
+        _default_store = PageStore()
+    return _default_store
+
+
+def _fill_missing_texts(source, reader, records, missing, workers):
+    workers = resolve_workers(len(missing), workers)
+    if workers == 1:
+        texts = [_page_text(reader.pages[i]) for i in missing]
+    else:
+        size = -(-len(missing) // workers)
+        chunks = [missing[i:i + size] for i in range(0, len(missing), size)]
+        with ProcessPoolExecutor(max_workers=len(chunks)) as pool:
+            futures = [pool.submit(_extract_pages, source, chunk) for chunk in chunks]
+            texts = [text for future in futures for text in future.result()]
+    for i, text in zip(missing, texts):
+        records[i] = {"text": text, "parses": {}}
+
+
+def extract_bank_incremental(pdf_path, store=None, workers=None, stats=None):
+    # Same result as extract_qb.extract_bank(); pdf_path may also be the PDF's
+    # bytes or a binary file object. Pass a dict as stats to get counts of
+    # pages extracted/parsed versus reused.
+    store = store or default_store()
+    source = pdf_data(pdf_path)
+    reader = PdfReader(pdf_stream(source))
+    fingerprints = [page_fingerprint(page) for page in reader.pages]
+    records = [store.get(fp) for fp in fingerprints]
+    missing = [i for i, record in enumerate(records) if record is None]
+    if missing:
+        _fill_missing_texts(source, reader, records, missing, workers)
+
+    parser = BankParser()
+    questions = []
+    parsed_pages = 0
+    for fingerprint, record in zip(fingerprints, records):
+        start_state = parser.snapshot()
+        key = _state_key(start_state)
+        parsed = record["parses"].get(key)
+        if parsed is None:
+            page_questions = []
+            for line in record["text"].split("\n"):
+                page_questions.extend(parser.feed(line))
+            parsed = {
+                "questions": [q.to_dict() for q in page_questions],
+                "end_state": parser.snapshot(),
+            }
+            # Header scanning may finish on this page; the end state then no
+            # longer carries the header, so keep the final values alongside
+            if start_state[-1] is not None:
+                parsed["header"] = parser.header
+                parsed["course_outcomes"] = parser.course_outcomes
+            parses = record["parses"]
+            parses[key] = parsed
+            while len(parses) > MAX_PARSES_PER_PAGE:
+                del parses[next(iter(parses))]
+            store.put(fingerprint, record)
+            parsed_pages += 1
+            questions.extend(page_questions)
+        else:
+            parser.restore(parsed["end_state"])
+            if "header" in parsed:
+                parser.header = dict(parsed["header"])
+                parser.course_outcomes = list(parsed["course_outcomes"])
+            questions.extend(Question.from_dict(q) for q in parsed["questions"])
+    questions.extend(parser.close())
+
+    if stats is not None:
+        stats.update(
+            pages=len(fingerprints),
+            extracted=len(missing),
+            parsed=parsed_pages,
+        )
+    return parser.header, questions, parser.course_outcomes
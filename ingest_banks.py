@@ -0,0 +1,153 @@
+# ingest_banks.py – batch-ingest a directory of question bank PDFs
+#
+#   python ingest_banks.py BANK_DIR [--out bank_index] [--workers N] [--db questions.db]
+#
+# Every PDF under BANK_DIR is parsed in a process pool. One JSON index per
+# subject is written to --out (all banks of that subject, e.g. CAT-1 and
+# CAT-2, with the near-duplicate clusters found across them), plus
+# summary.json with question counts per unit × part. A bank that fails to
+# parse is reported and skipped; the rest of the batch carries on. Parsed
+# banks are held as QuestionBank columns until their subject is written.
+import argparse
+import json
+import os
+import sys
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from bank_cache import load_bank
+from near_dupes import cluster
+from question_bank import PARTS, QuestionBank
+from question_store import QuestionStore
+
+
+def find_banks(root):
+    paths = []
+    for dirpath, _, filenames in os.walk(root):
+        for name in filenames:
+            if name.lower().endswith(".pdf"):
+                paths.append(os.path.join(dirpath, name))
+    return sorted(paths)
+
+
+def _ingest_one(pdf_path):
+    # Runs in a pool worker, so page extraction inside it stays serial
+    header, questions, cos = load_bank(pdf_path, workers=1)
+    if not header.get("subject_code"):
+        raise ValueError("no subject code found in header")
+    if not questions:
+        raise ValueError("no questions found")
+    return header, QuestionBank(questions), cos
+
+
+def unit_part_counts(question_banks):
+    # {unit: {part: questions}} over a subject's QuestionBanks
+    units = sorted({unit for bank in question_banks for unit in set(bank.units)})
+    return {
+        str(unit): {part: sum(len(bank.rows(unit=unit, part=part)) for bank in question_banks) for part in PARTS}
+        for unit in units
+    }
+
+
+def near_duplicate_groups(banks):
+    # [[[bank index, question index], ...], ...] for every cluster of two or
+    # more near-identical questions across a subject's banks
+    refs = [(b, i) for b, bank in enumerate(banks) for i in range(len(bank["questions"]))]
+    labels = cluster([banks[b]["questions"].texts[i] for b, i in refs])
+    groups = {}
+    for ref, rep in zip(refs, labels):
+        groups.setdefault(rep, []).append(list(ref))
+    return [group for group in groups.values() if len(group) > 1]
+
+
+def ingest_directory(root, out_dir, workers=None, db_path=None, progress=print):
+    paths = find_banks(root)
+    subjects = defaultdict(list)
+    failed = []
+    store = QuestionStore(db_path) if db_path else None
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = {pool.submit(_ingest_one, path): path for path in paths}
+        for done, future in enumerate(as_completed(futures), start=1):
+            path = futures[future]
+            rel = os.path.relpath(path, root)
+            try:
+                header, questions, cos = future.result()
+            except Exception as e:
+                failed.append({"source": rel, "error": str(e)})
+                progress(f"[{done}/{len(paths)}] FAILED {rel}: {e}")
+                continue
+            subject = header["subject_code"]
+            subjects[subject].append({
+                "source": rel,
+                "header": header,
+                "course_outcomes": cos,
+                "questions": questions,
+            })
+            if store is not None:
+                store.ingest(header, list(questions), cos, name=rel)
+            progress(f"[{done}/{len(paths)}] {rel}: {subject}, {len(questions)} questions")
+
+    if store is not None:
+        store.close()
+
+    os.makedirs(out_dir, exist_ok=True)
+    summary = {"subjects": {}, "failed": failed}
+    for subject, banks in sorted(subjects.items()):
+        banks.sort(key=lambda bank: bank["source"])
+        duplicates = near_duplicate_groups(banks)
+        with open(os.path.join(out_dir, f"{subject}.json"), "w", encoding="utf-8") as f:
+            json.dump(
+                {
+                    "subject_code": subject,
+                    "banks": [dict(bank, questions=[q.to_dict() for q in bank["questions"]]) for bank in banks],
+                    "near_duplicates": duplicates,
+                },
+                f,
+                ensure_ascii=False,
+            )
+        question_banks = [bank["questions"] for bank in banks]
+        total = sum(map(len, question_banks))
+        summary["subjects"][subject] = {
+            "banks": [bank["source"] for bank in banks],
+            "questions": total,
+            "distinct": total - sum(len(group) - 1 for group in duplicates),
+            "unit_part": unit_part_counts(question_banks),
+        }
+    with open(os.path.join(out_dir, "summary.json"), "w", encoding="utf-8") as f:
+        json.dump(summary, f, ensure_ascii=False, indent=2)
+    return summary
+
+
+def print_summary(summary):
+    for subject, info in summary["subjects"].items():
+        print(
+            f"\n{subject}: {info['questions']} questions ({info['distinct']} distinct) "
+            f"from {len(info['banks'])} bank(s)"
+        )
+        print("  Unit   " + "  ".join(f"{p:>4}" for p in PARTS))
+        for unit, counts in info["unit_part"].items():
+            print(f"  {unit:>4}   " + "  ".join(f"{counts.get(p, 0):>4}" for p in PARTS))
+    if summary["failed"]:
+        print(f"\n{len(summary['failed'])} bank(s) failed:")
+        for item in summary["failed"]:
+            print(f"  {item['source']}: {item['error']}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Batch-ingest a directory of question bank PDFs.")
+    parser.add_argument("bank_dir", help="directory searched recursively for *.pdf")
+    parser.add_argument("--out", default="bank_index", help="output directory (default: bank_index)")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: one per core)")
+    parser.add_argument("--db", default=None, help="also ingest into this SQLite question store")
+    args = parser.parse_args(argv)
+
+    if not os.path.isdir(args.bank_dir):
+        parser.error(f"not a directory: {args.bank_dir}")
+    summary = ingest_directory(args.bank_dir, args.out, args.workers, args.db)
+    print_summary(summary)
+    return 1 if summary["failed"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
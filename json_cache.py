@@ -0,0 +1,88 @@
+# json_cache.py – size-capped directory of JSON entries with LRU eviction
+import json
+import os
+import tempfile
+
+# Eviction trims to this share of max_bytes, so a full cache is not rescanned
+# on every store
+EVICT_TO = 0.9
+
+
+class JsonCache:
+    def __init__(self, cache_dir, max_bytes):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        # Bytes in the directory, counted once and then kept up to date by
+        # store(); the directory is only rescanned when this passes max_bytes
+        self._total = None
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, f"{key}.json")
+
+    def load(self, key):
+        path = self._path(key)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            return None
+        # Touch on hit so eviction drops the least recently used entries first
+        try:
+            os.utime(path, None)
+        except OSError:
+            pass
+        return entry
+
+    def store(self, key, entry):
+        path = self._path(key)
+        # A temp file of its own per write: sessions are threads of one
+        # process, so concurrent stores of the same key must not share one
+        fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(entry, f, ensure_ascii=False)
+            size = os.path.getsize(tmp_path)
+            try:
+                replaced = os.path.getsize(path)
+            except OSError:
+                replaced = 0
+            os.replace(tmp_path, path)
+        except BaseException:
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+            raise
+        if self._total is None:
+            self.evict()
+        else:
+            self._total += size - replaced
+            if self._total > self.max_bytes:
+                self.evict()
+
+    def evict(self):
+        entries = []
+        total = 0
+        for name in os.listdir(self.cache_dir):
+            if not name.endswith(".json"):
+                continue
+            try:
+                st = os.stat(os.path.join(self.cache_dir, name))
+            except OSError:
+                continue
+            entries.append((st.st_mtime, st.st_size, name))
+            total += st.st_size
+        entries.sort()
+        if total <= self.max_bytes:
+            self._total = total
+            return
+        for _, size, name in entries:
+            if total <= self.max_bytes * EVICT_TO:
+                break
+            try:
+                os.remove(os.path.join(self.cache_dir, name))
+            except OSError:
+                continue
+            total -= size
+        self._total = total
@@ -0,0 +1,113 @@
+# layout.py – text measurement, line wrapping and pagination for the PDF renderer
+#
+# Questions are shared by every version drawn from a pool, so the same texts
+# are wrapped again and again. Word widths are measured once per font and
+# size and a line's width is their sum (the standard Type 1 fonts have no
+# kerning, so this matches measuring the whole line); wrapped lines are
+# memoized per (text, width, font, size).
+from functools import lru_cache
+
+from reportlab.pdfbase.pdfmetrics import stringWidth
+
+MAX_WORDS = 1 << 16  # per font and size, before the cache is reset
+
+_widths = {}
+
+
+def word_width(word, font="Times-Roman", font_size=11):
+    cache = _widths.get((font, font_size))
+    if cache is None or len(cache) > MAX_WORDS:
+        cache = _widths[font, font_size] = {}
+    width = cache.get(word)
+    if width is None:
+        width = cache[word] = stringWidth(word, font, font_size)
+    return width
+
+
+@lru_cache(maxsize=4096)
+def wrap_lines(text, max_width, font="Times-Roman", font_size=11):
+    # Greedy wrap: a word joins the line while the line plus a trailing space
+    # fits; a word wider than max_width gets a line of its own
+    space = word_width(" ", font, font_size)
+    lines = []
+    current = []
+    width = 0.0
+    for word in text.split():
+        w = word_width(word, font, font_size) + space
+        if width + w <= max_width:
+            current.append(word)
+            width += w
+        else:
+            if current:
+                lines.append(" ".join(current))
+            current = [word]
+            width = w
+    if current:
+        lines.append(" ".join(current))
+    return tuple(lines)
+
+
+# Pagination. A paper is laid out in two passes: every block (section
+# heading, question, OR pair) is measured from its wrapped lines, then the
+# blocks are packed onto pages. A block never splits across pages, and a
+# keep_with_next block (a heading) only goes where the block after it fits too.
+
+DESCENT = 4  # below the last baseline, for descenders
+
+
+class Block:
+    # height: how far the next block starts below this one's first baseline;
+    # depth: how far its ink reaches below that baseline. draw(c, y) draws
+    # the block with its first baseline at y. A block without draw is space;
+    # it has no effect at the top of a page.
+    __slots__ = ("height", "depth", "draw", "keep_with_next")
+
+    def __init__(self, height, depth, draw=None, keep_with_next=False):
+        self.height = height
+        self.depth = depth
+        self.draw = draw
+        self.keep_with_next = keep_with_next
+
+
+def spacer(height):
+    return Block(height, 0)
+
+
+def paginate(blocks, y, top, bottom):
+    # [[(y, block), ...] per page]; the first page starts at y, later ones at
+    # top, and no block's ink goes below bottom unless it is taller than a page
+    pages = [[]]
+    i = 0
+    while i < len(blocks):
+        block = blocks[i]
+        if block.draw is None:
+            y -= block.height
+            i += 1
+            continue
+        # A heading is placed together with what follows it
+        need = block.depth
+        offset = 0
+        j = i
+        while blocks[j].keep_with_next and j + 1 < len(blocks):
+            offset += blocks[j].height
+            j += 1
+            need = offset + blocks[j].depth
+        # The first page is never left empty: the header is on it
+        if y - need < bottom:
+            pages.append([])
+            y = top
+        for block in blocks[i:j + 1]:
+            if block.draw is not None:
+                pages[-1].append((y, block))
+            y -= block.height
+        i = j + 1
+    return pages
+
+
+def draw_pages(c, pages):
+    # Draws paginate()'s result; the caller ends the last page
+    for n, page in enumerate(pages):
+        if n:
+            c.showPage()
+        for y, block in page:
+            block.draw(c, y)
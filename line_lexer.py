@@ -0,0 +1,88 @@
+# line_lexer.py – precompiled line classifiers for question bank text
+import re
+
+# Plain-layout kinds, in the priority order LineStructurer applies them
+TITLE = "title"
+SUBTITLE = "subtitle"
+CODE = "code"
+CO = "co"
+UNIT = "unit"
+PART = "part"
+SKIP = "skip"
+QNUM = "qnum"
+TEXT = "text"
+
+# Keywords that may appear anywhere in a raw line, matched against
+# line.upper(). _PLAIN_ANY is the cheap reject for ordinary question text;
+# only lines that hit it are rescanned with _PLAIN_KEYWORDS, a bare lookahead
+# so finditer reports every keyword start even when keywords overlap.
+_PLAIN_ANY = re.compile(
+    r"TEST|REGULATIONS|DEPARTMENT|SEMESTER|COURSE OUTCOMES"
+    r"|UNIT\s*[-–]?\s*[IVX12345]|Q\.NO|QNO|QUESTIONS|CO'S|BLOOM|LEVEL"
+)
+_PLAIN_KEYWORDS = re.compile(
+    r"(?=(?P<title>TEST)"
+    r"|(?P<subtitle>REGULATIONS|DEPARTMENT|SEMESTER|COURSE OUTCOMES)"
+    r"|(?P<unit>UNIT\s*[-–]?\s*[IVX12345]+)"
+    r"|(?P<skip>Q\.NO|QNO|QUESTIONS|CO'S|BLOOM|LEVEL))"
+)
+
+# Shapes that only count at the start of a raw line
+_PLAIN_ANCHORED = re.compile(
+    r"(?P<code>\d{4}[A-Z]{3}\d{3}T)"
+    r"|(?P<co>CO(?=.*:))"
+    r"|(?P<part>(?i:PART))"
+    r"|(?P<qnum>(?P<qnum_digits>\d+)[\.\s]*(?P<qnum_rest>.*))"
+)
+
+COBLOOM_AT_END = re.compile(r"(CO\d+)\s*(K\d+)$")
+
+
+def classify_plain(line):
+    # Returns (kind, match) for a raw bank line; match is the anchored match
+    # for CODE/CO/PART/QNUM, otherwise None
+    kinds = ()
+    upper = line.upper()
+    if _PLAIN_ANY.search(upper):
+        kinds = {m.lastgroup for m in _PLAIN_KEYWORDS.finditer(upper)}
+        if TITLE in kinds:
+            return TITLE, None
+    if SUBTITLE in kinds:
+        return SUBTITLE, None
+    m = _PLAIN_ANCHORED.match(line)
+    kind = m.lastgroup if m else None
+    if kind in (CODE, CO):
+        return kind, m
+    if UNIT in kinds:
+        return UNIT, None
+    if kind == PART:
+        return PART, m
+    if SKIP in kinds:
+        return SKIP, None
+    if kind == QNUM:
+        return QNUM, m
+    return TEXT, None
+
+
+# Question-stage lexer over stripped plain-layout lines. One anchored
+# alternation; branches are tried in the order the old if-chain used.
+_QUESTION_LINE = re.compile(
+    r"(?P<unit>(?i:Unit\s*[–-]?\s*(?P<roman>I{1,5}|IV|V)\b))"
+    r"|(?P<part>(?i:PART\s*[–-]?\s*(?P<letter>[A-C])\b))"
+    r"|(?P<skip>CO\d+:|(?i:Q.NO|QUESTIONS|CO’S|BLOOM|LEVEL))"
+    r"|(?P<qnum>(?P<number>\d{1,2})\.\s*(?P<rest>.*)$)"
+)
+
+CO_BLOOM = re.compile(r"CO(\d+)\s+K(\d+)(?:\s*Q\.)?", re.IGNORECASE)
+CO_START = re.compile(r"^CO[1-5]:")
+SUBJECT = re.compile(r"(\d{4}[A-Z]{3}\d{3}T|[A-Z]{3}\d{3}T)\s*[-–]?\s*(.+)")
+
+
+def classify_question_line(line):
+    # Returns (kind, match) with kind one of UNIT, PART, SKIP, QNUM, TEXT
+    if not line:
+        return SKIP, None
+    m = _QUESTION_LINE.match(line)
+    if m is None:
+        return TEXT, None
+    return m.lastgroup, m
@@ -0,0 +1,112 @@
+# near_dupes.py – cluster near-duplicate questions with MinHash and LSH
+#
+# Merged banks (CAT-1 + CAT-2 for endsem) repeat questions with small
+# wording or punctuation changes. Each text is normalised (case, punctuation,
+# spacing) and reduced to character shingles, a
+# MinHash signature estimates Jaccard similarity between shingle sets, and
+# LSH banding only compares texts that collide in at least one band, so the
+# work grows with the pool rather than with the number of pairs.
+import re
+
+import numpy as np
+
+NUM_PERM = 128
+BANDS = 16  # 8 rows per band: pairs at 0.85 collide ~99% of the time, at 0.5 ~6%
+# Roots compared within one bucket; a bucket is a run of near-identical
+# signatures, so a match is almost always among the first few
+MAX_BUCKET_COMPARES = 16
+# Same question up to numbering, punctuation, case and small rewording;
+# swapping one content word in a short question stays just below this
+THRESHOLD = 0.85
+SHINGLE = 5
+
+_rng = np.random.default_rng(0x5EED)
+# Multiply-shift hash family; fixed so signatures are stable across runs
+_A = _rng.integers(1, 1 << 63, size=NUM_PERM, dtype=np.uint64) * np.uint64(2) + np.uint64(1)
+_B = _rng.integers(0, 1 << 63, size=NUM_PERM, dtype=np.uint64)
+
+_WORD = re.compile(r"\w+")
+
+
+def normalise(text):
+    return " ".join(_WORD.findall(text.lower()))
+
+
+def shingles(text):
+    # Character shingles of the normalised text (for inspection; signatures()
+    # computes the same windows on the encoded bytes without building sets)
+    norm = normalise(text).ljust(SHINGLE)
+    return {norm[i:i + SHINGLE] for i in range(len(norm) - SHINGLE + 1)}
+
+
+def _windows(block):
+    # Every SHINGLE-byte window of each normalised text packed into one
+    # integer, and the offset of each text's first window. MinHash ignores
+    # repeats, so the windows need no de-duplication.
+    encoded = [normalise(t).encode("utf-8").ljust(SHINGLE) for t in block]
+    counts = np.array([len(e) - SHINGLE + 1 for e in encoded])
+    starts = np.concatenate([[0], np.cumsum([len(e) for e in encoded])[:-1]])
+    buf = np.frombuffer(b"".join(encoded), dtype=np.uint8).astype(np.uint64)
+    offsets = np.concatenate([[0], np.cumsum(counts)[:-1]])
+    idx = np.repeat(starts - offsets, counts) + np.arange(int(counts.sum()))
+    values = np.zeros(len(idx), dtype=np.uint64)
+    for k in range(SHINGLE):
+        values |= buf[idx + k] << np.uint64(8 * k)
+    return values, offsets
+
+
+def signatures(texts, chunk=1024, perm_block=32):
+    # (len(texts), NUM_PERM) MinHash signatures
+    sigs = np.empty((len(texts), NUM_PERM), dtype=np.uint32)
+    for start in range(0, len(texts), chunk):
+        values, offsets = _windows(texts[start:start + chunk])
+        rows = slice(start, start + len(offsets))
+        for p in range(0, NUM_PERM, perm_block):
+            a = _A[p:p + perm_block, None]
+            b = _B[p:p + perm_block, None]
+            with np.errstate(over="ignore"):
+                mixed = ((a * values[None, :] + b) >> np.uint64(32)).astype(np.uint32)
+            sigs[rows, p:p + perm_block] = np.minimum.reduceat(mixed, offsets, axis=1).T
+    return sigs
+
+
+def _find(parent, i):
+    while parent[i] != i:
+        parent[i] = parent[parent[i]]
+        i = parent[i]
+    return i
+
+
+def cluster(texts, threshold=THRESHOLD):
+    # Returns a label per text: the index of the first text in its cluster
+    n = len(texts)
+    parent = list(range(n))
+    if n < 2:
+        return parent
+    sigs = signatures(texts)
+    rows = NUM_PERM // BANDS
+    for band in range(BANDS):
+        keys = np.ascontiguousarray(sigs[:, band * rows:(band + 1) * rows]).view(
+            np.dtype((np.void, rows * sigs.itemsize))
+        ).ravel()
+        order = np.argsort(keys, kind="stable")
+        sorted_keys = keys[order]
+        starts = np.flatnonzero(np.r_[True, sorted_keys[1:] != sorted_keys[:-1]])
+        ends = np.r_[starts[1:], n]
+        for s, e in zip(starts, ends):
+            if e - s < 2:
+                continue
+            # Compare cluster roots, not members, so a chain of small edits
+            # cannot drift into one cluster of unrelated questions
+            roots = list(dict.fromkeys(_find(parent, i) for i in order[s:e]))
+            for j in range(1, len(roots)):
+                rb = _find(parent, roots[j])
+                for ra in roots[max(0, j - MAX_BUCKET_COMPARES):j]:
+                    ra = _find(parent, ra)
+                    if ra == rb:
+                        break
+                    if (sigs[ra] == sigs[rb]).mean() >= threshold:
+                        parent[max(ra, rb)] = min(ra, rb)
+                        rb = min(ra, rb)
+                        break
+    return [_find(parent, i) for i in range(n)]
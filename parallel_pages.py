@@ -0,0 +1,39 @@
+# parallel_pages.py – fan page-range extraction out across processes
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+# Below this many pages the pool start-up costs more than it saves
+PARALLEL_MIN_PAGES = 16
+
+
+def resolve_workers(page_count, workers=None):
+    # workers=None → one per core. Returns 1 when serial extraction is better.
+    if workers is None:
+        workers = os.cpu_count() or 1
+    if page_count < PARALLEL_MIN_PAGES:
+        return 1
+    return max(1, min(workers, page_count))
+
+
+def page_ranges(page_count, workers):
+    # Contiguous, near-equal (start, stop) ranges covering every page in order
+    size, extra = divmod(page_count, workers)
+    ranges = []
+    start = 0
+    for i in range(workers):
+        stop = start + size + (1 if i < extra else 0)
+        if stop > start:
+            ranges.append((start, stop))
+        start = stop
+    return ranges
+
+
+def map_page_ranges(extract_range, pdf_path, page_count, workers):
+    # extract_range(pdf_path, start, stop) must be a module-level function so
+    # it can be pickled; each worker opens the file (or the PDF's bytes)
+    # itself. Results are yielded in page order as soon as each range is done.
+    ranges = page_ranges(page_count, workers)
+    with ProcessPoolExecutor(max_workers=len(ranges)) as pool:
+        futures = [pool.submit(extract_range, pdf_path, start, stop) for start, stop in ranges]
+        for future in futures:
+            yield future.result()
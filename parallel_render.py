@@ -0,0 +1,135 @@
+# parallel_render.py – render paper versions across processes
+#
+# Canvas rendering is pure Python and holds the GIL, so versions are drawn
+# in worker processes. Question selection stays with the caller: it is cheap,
+# and the overlap budget makes it sequential. Workers get the selected papers
+# and return PDF bytes, which are yielded as each version finishes.
+import os
+import threading
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+
+from generate_pdf1 import generate_pdf, generate_pdf_endsem
+
+# Below this many versions the pool costs more than it saves
+PARALLEL_MIN_VERSIONS = 3
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def resolve_workers(count, workers=None):
+    # workers=None → one per core. Returns 1 when rendering in-process is better.
+    if workers is None:
+        workers = os.cpu_count() or 1
+    if count < PARALLEL_MIN_VERSIONS:
+        return 1
+    return max(1, min(workers, count))
+
+
+def render_paper(exam_type, header, cos, selected, branch, qcode, month_year, tallow=None,
+                 output_path=None, c=None):
+    # One version; returns the PDF's bytes when output_path and c are None.
+    # Module-level so worker processes can run it.
+    if exam_type in ["cat1", "cat2"]:
+        return generate_pdf(
+            header=header,
+            selected_questions=selected,
+            branch=branch,
+            qcode=qcode,
+            output_path=output_path,
+            cos=cos,
+            month_year=month_year,
+            exam_type=exam_type,
+            c=c,
+        )
+    return generate_pdf_endsem(
+        header=header,
+        selected_questions=selected,
+        branch=branch,
+        qcode=qcode,
+        output_path=output_path,
+        cos=cos,
+        month_year=month_year,
+        exam_type=exam_type,
+        tallow=tallow,
+        c=c,
+    )
+
+
+def _shared_executor():
+    # One pool per process, sized to the machine and kept between calls:
+    # starting the workers costs more than a version. Sessions are threads
+    # that share it; each call bounds its own concurrency instead of
+    # resizing the pool under the others.
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ProcessPoolExecutor(max_workers=os.cpu_count() or 1)
+        return _executor
+
+
+def _discard_executor(executor):
+    # A worker died; the next call starts a fresh pool
+    global _executor
+    with _executor_lock:
+        if _executor is executor:
+            _executor = None
+    executor.shutdown(wait=False)
+
+
+def _submit(executor, fn, *args):
+    # (future, executor it went to): a pool that broke, or that another call
+    # shut down after it broke, is swapped for the current shared one
+    try:
+        return executor.submit(fn, *args), executor
+    except (BrokenProcessPool, RuntimeError):
+        _discard_executor(executor)
+        executor = _shared_executor()
+        return executor.submit(fn, *args), executor
+
+
+def render_versions(exam_type, header, cos, papers, branch, qcode, month_year, tallow=None, workers=None):
+    # papers: [(version, selected)]. Yields (version, pdf bytes, None) or
+    # (version, None, exception) in the order the versions finish. At most
+    # workers versions of this call are in the pool at once.
+    workers = resolve_workers(len(papers), workers)
+    args = (branch, qcode, month_year, tallow)
+    if workers == 1:
+        for version, selected in papers:
+            try:
+                yield version, render_paper(exam_type, header, cos, selected, *args), None
+            except Exception as e:
+                yield version, None, e
+        return
+
+    executor = _shared_executor()
+    queue = iter(papers)
+    running = {}
+    while True:
+        # Top up to workers versions of this call in the pool
+        for version, selected in queue:
+            try:
+                future, executor = _submit(executor, render_paper, exam_type, header, cos, selected, *args)
+            except Exception as e:
+                yield version, None, e
+                continue
+            running[future] = (version, executor)
+            if len(running) >= workers:
+                break
+        if not running:
+            return
+        done, _ = wait(running, return_when=FIRST_COMPLETED)
+        for future in done:
+            version, pool = running.pop(future)
+            try:
+                yield version, future.result(), None
+            except BrokenProcessPool as e:
+                # Only the pool this version ran in is replaced; versions
+                # submitted since then are in a newer one
+                _discard_executor(pool)
+                if pool is executor:
+                    executor = _shared_executor()
+                yield version, None, e
+            except Exception as e:
+                yield version, None, e
@@ -0,0 +1,35 @@
+# pdf_source.py – PDF inputs given as a path, bytes or a binary file object
+#
+# An upload never has to be written to disk: its bytes are read once, then
+# reopened as a BytesIO wherever a reader is needed, including in worker
+# processes (bytes pickle; open file objects do not).
+import io
+import os
+
+
+def pdf_data(source):
+    # A path stays a path; bytes and file objects become bytes
+    if isinstance(source, (str, os.PathLike)):
+        return source
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        return bytes(source)
+    if hasattr(source, "getvalue"):
+        return source.getvalue()
+    source.seek(0)
+    return source.read()
+
+
+def pdf_stream(source):
+    # What PdfReader and pdfplumber.open accept, for a pdf_data() result
+    if isinstance(source, bytes):
+        return io.BytesIO(source)
+    return source
+
+
+def pdf_bytes(source):
+    # The file's contents, e.g. for a content hash
+    source = pdf_data(source)
+    if isinstance(source, bytes):
+        return source
+    with open(source, "rb") as f:
+        return f.read()
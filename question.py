@@ -1,10 +1,29 @@
+import hashlib
+
+
+def question_id(unit, part, text):
+    # Stable across runs and re-parses: derived from the same fields __eq__ compares
+    digest = hashlib.blake2b(f"{unit}\x1f{part}\x1f{text}".encode("utf-8"), digest_size=8).digest()
+    return int.from_bytes(digest, "big")
+
+
+def text_id(text):
+    # The same question text (up to spacing) under any unit or part
+    digest = hashlib.blake2b(" ".join(text.split()).encode("utf-8"), digest_size=8).digest()
+    return int.from_bytes(digest, "big")
+
+
 class Question:
+    __slots__ = ("unit", "part", "text", "co", "bloom", "qid", "tid")
+
     def __init__(self, unit, part, text, co, bloom):
         self.unit = int(unit)   # 🔥 CRITICAL FIX
         self.part = part
         self.text = text
         self.co = co
         self.bloom = bloom   # K1, K2...
+        self.qid = question_id(self.unit, part, text)
+        self.tid = text_id(text)
 
     def to_dict(self):
         return {
@@ -14,10 +33,27 @@ class Question:
             "co": self.co,
             "bloom": self.bloom
         }
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(
+            unit=data["unit"],
+            part=data["part"],
+            text=data["text"],
+            co=data["co"],
+            bloom=data["bloom"],
+        )
     
     def __eq__(self, other):
         if not isinstance(other, Question):
             return False
-        return (self.unit == other.unit and
+        # Different ids settle it without comparing texts
+        return (self.qid == other.qid and
+                self.unit == other.unit and
                 self.part == other.part and
-                self.text == other.text)
\ No newline at end of file
+                self.text == other.text)
+
+    def __hash__(self):
+        # qid is fixed at construction, so a question keeps its hash even if
+        # its text is decorated later
+        return hash(self.qid)
@@ -0,0 +1,115 @@
+# question_bank.py – compact column store for institution-scale question pools
+from array import array
+
+from question import Question
+
+PARTS = ("A", "B", "C")
+_PART_CODES = {part: i for i, part in enumerate(PARTS)}
+
+
+def _number(tag):
+    # "CO3" → 3, "K2" → 2
+    return int(tag.lstrip("COKcok"))
+
+
+class QuestionBank:
+    # unit/part/CO/bloom live in one-byte arrays next to the question ids and
+    # texts; a repeated question (same id) is stored once. Membership goes
+    # through an open-addressing table of row numbers keyed by the stable
+    # question id, so it is O(1) without a dict entry and int object per row.
+    # rows() queries go through per-value row lists, one array("I") per
+    # unit, part, CO and Bloom level.
+    def __init__(self, questions=()):
+        self.ids = array("Q")
+        self.units = array("B")
+        self.parts = array("B")
+        self.cos = array("B")
+        self.blooms = array("B")
+        self.texts = []
+        self._table = array("I", bytes(4 * 64))  # row + 1, 0 = empty
+        self._index = {}  # (column number, code) → array("I") of rows
+        for q in questions:
+            self.add(q)
+
+    def _find(self, qid):
+        # Returns (slot, row); row is None when qid is absent and slot is free
+        table = self._table
+        mask = len(table) - 1
+        slot = qid & mask
+        while True:
+            entry = table[slot]
+            if entry == 0:
+                return slot, None
+            if self.ids[entry - 1] == qid:
+                return slot, entry - 1
+            slot = (slot + 1) & mask
+
+    def _grow(self):
+        self._table = array("I", bytes(4 * len(self._table) * 2))
+        mask = len(self._table) - 1
+        for row, qid in enumerate(self.ids):
+            slot = qid & mask
+            while self._table[slot]:
+                slot = (slot + 1) & mask
+            self._table[slot] = row + 1
+
+    def add(self, q):
+        slot, row = self._find(q.qid)
+        if row is not None:
+            return row
+        row = len(self.texts)
+        codes = (q.unit, _PART_CODES[q.part], _number(q.co), _number(q.bloom))
+        self.ids.append(q.qid)
+        for i, (column, code) in enumerate(zip(self._columns(), codes)):
+            column.append(code)
+            self._index.setdefault((i, code), array("I")).append(row)
+        self.texts.append(q.text)
+        self._table[slot] = row + 1
+        # Keep the load factor under one half
+        if 2 * len(self.texts) > len(self._table):
+            self._grow()
+        return row
+
+    def __len__(self):
+        return len(self.texts)
+
+    def __contains__(self, item):
+        qid = item.qid if isinstance(item, Question) else item
+        return self._find(qid)[1] is not None
+
+    def row_of(self, item):
+        qid = item.qid if isinstance(item, Question) else item
+        row = self._find(qid)[1]
+        if row is None:
+            raise KeyError(qid)
+        return row
+
+    def __getitem__(self, row):
+        return Question(
+            unit=self.units[row],
+            part=PARTS[self.parts[row]],
+            text=self.texts[row],
+            co=f"CO{self.cos[row]}",
+            bloom=f"K{self.blooms[row]}",
+        )
+
+    def __iter__(self):
+        for row in range(len(self)):
+            yield self[row]
+
+    def _columns(self):
+        return self.units, self.parts, self.cos, self.blooms
+
+    def rows(self, unit=None, part=None, co=None, bloom=None):
+        # Row numbers matching every given field, in row order; co/bloom
+        # accept "CO3"/"K2" or 3/2. Reads the shortest matching row list and
+        # checks the other fields on it.
+        part = None if part is None else _PART_CODES[part]
+        co = _number(co) if isinstance(co, str) else co
+        bloom = _number(bloom) if isinstance(bloom, str) else bloom
+        columns = self._columns()
+        wanted = [(i, code) for i, code in enumerate((unit, part, co, bloom)) if code is not None]
+        if not wanted:
+            return list(range(len(self)))
+        shortest = min((self._index.get(key, ()) for key in wanted), key=len)
+        return [row for row in shortest if all(columns[i][row] == code for i, code in wanted)]
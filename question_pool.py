@@ -0,0 +1,99 @@
+# question_pool.py – question list indexed once, sampled many times
+from collections.abc import Mapping
+import hashlib
+
+from near_dupes import cluster
+
+
+class _Parts(dict):
+    # part → questions of one unit; absent parts read as empty
+    def __missing__(self, part):
+        return []
+
+
+class QuestionPool(Mapping):
+    # Built once per bank and handed to the cat_rules generators in place of
+    # the question list. It is the by_unit[unit][part] mapping they would
+    # otherwise rebuild on every call, plus CO and Bloom indexes. Near-duplicate
+    # questions (e.g. the same question in the CAT-1 and CAT-2 banks) are
+    # clustered once here, and the same text listed twice always is; key()
+    # gives the cluster, so selection treats the whole cluster as one question.
+    def __init__(self, questions, dedupe=True):
+        self.questions = list(questions)
+        self._digest = None
+        self._cluster = {}
+        if dedupe:
+            labels = cluster([q.text for q in self.questions])
+            for q, rep in zip(self.questions, labels):
+                if self.questions[rep].qid != q.qid:
+                    self._cluster[q.qid] = self.questions[rep].qid
+        # The same text under another part or unit is the same question even
+        # without near-duplicate clustering
+        first = {}
+        for q in self.questions:
+            rep = first.setdefault(q.tid, q)
+            if self.key(rep) != self.key(q):
+                self._cluster[q.qid] = self.key(rep)
+        self._by_unit = {}
+        self._by_co = {}
+        self._by_bloom = {}
+        for q in self.questions:
+            self._by_unit.setdefault(q.unit, _Parts()).setdefault(q.part, []).append(q)
+            self._by_co.setdefault(q.co, []).append(q)
+            self._by_bloom.setdefault(q.bloom, []).append(q)
+
+    def __getitem__(self, unit):
+        parts = self._by_unit.get(unit)
+        return parts if parts is not None else _Parts()
+
+    def __iter__(self):
+        return iter(sorted(self._by_unit))
+
+    def __len__(self):
+        return len(self._by_unit)
+
+    def get(self, unit, part):
+        return self[unit][part]
+
+    def key(self, q):
+        # qid of the first question in q's near-duplicate cluster
+        return self._cluster.get(q.qid, q.qid)
+
+    def excluding(self, qids):
+        # Pool without the questions in qids or any of their near-duplicates;
+        # shares this pool's clusters instead of recomputing them
+        if not qids:
+            return self
+        stale = {self.key(q) for q in self.questions if q.qid in qids}
+        pool = QuestionPool((q for q in self.questions if self.key(q) not in stale), dedupe=False)
+        pool._cluster = self._cluster
+        return pool
+
+    def duplicates(self):
+        # [[question, near-duplicates...]] for every cluster of two or more
+        groups = {}
+        for q in self.questions:
+            groups.setdefault(self.key(q), []).append(q)
+        return [group for group in groups.values() if len(group) > 1]
+
+    def by_co(self, co):
+        return self._by_co.get(co, [])
+
+    def by_bloom(self, bloom):
+        return self._by_bloom.get(bloom, [])
+
+    def units(self):
+        return sorted(self._by_unit)
+
+    def size(self):
+        return len(self.questions)
+
+    def digest(self):
+        # Content hash of the pool (question ids in order); equal for the same
+        # banks parsed by the same parser version
+        if self._digest is None:
+            h = hashlib.blake2b(digest_size=16)
+            for q in self.questions:
+                h.update(q.qid.to_bytes(8, "big"))
+            self._digest = h.hexdigest()
+        return self._digest
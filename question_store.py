@@ -0,0 +1,187 @@
+# question_store.py – SQLite-backed question repository
+#
+# A bank is ingested once (header, course outcomes and the questions from
+# extract_qb) and papers are then generated from indexed queries instead of
+# re-parsing PDFs.
+import json
+import os
+import sqlite3
+import time
+
+from near_dupes import cluster
+from question import Question
+
+STORE_PATH = os.environ.get(
+    "QPG_STORE_PATH",
+    os.path.join(os.path.expanduser("~"), ".cache", "question-paper-generator", "questions.db"),
+)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS banks (
+    bank_id INTEGER PRIMARY KEY,
+    subject_code TEXT NOT NULL,
+    name TEXT NOT NULL,
+    header TEXT NOT NULL,
+    course_outcomes TEXT NOT NULL,
+    ingested_at REAL NOT NULL,
+    UNIQUE (subject_code, name)
+);
+CREATE TABLE IF NOT EXISTS questions (
+    bank_id INTEGER NOT NULL REFERENCES banks (bank_id) ON DELETE CASCADE,
+    position INTEGER NOT NULL,
+    qid INTEGER NOT NULL,
+    subject_code TEXT NOT NULL,
+    unit INTEGER NOT NULL,
+    part TEXT NOT NULL,
+    text TEXT NOT NULL,
+    co TEXT NOT NULL,
+    bloom TEXT NOT NULL,
+    cluster INTEGER,
+    PRIMARY KEY (bank_id, position)
+);
+CREATE INDEX IF NOT EXISTS idx_questions_subject_unit_part ON questions (subject_code, unit, part);
+CREATE INDEX IF NOT EXISTS idx_questions_co ON questions (subject_code, co);
+CREATE INDEX IF NOT EXISTS idx_questions_bloom ON questions (subject_code, bloom);
+"""
+
+
+def _signed(qid):
+    # SQLite integers are signed 64-bit
+    return qid - (1 << 64) if qid >= (1 << 63) else qid
+
+
+def _unsigned(qid):
+    return qid + (1 << 64) if qid < 0 else qid
+
+
+class _Groups(dict):
+    # dict that fills missing keys on first access
+    def __init__(self, fetch):
+        super().__init__()
+        self._fetch = fetch
+
+    def __missing__(self, key):
+        value = self[key] = self._fetch(key)
+        return value
+
+
+class QuestionStore:
+    def __init__(self, path=STORE_PATH):
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.conn = sqlite3.connect(path)
+        self.conn.execute("PRAGMA foreign_keys = ON")
+        self.conn.executescript(SCHEMA)
+        columns = {row[1] for row in self.conn.execute("PRAGMA table_info(questions)")}
+        if "cluster" not in columns:
+            # Stores created before near-duplicate clustering
+            self.conn.execute("ALTER TABLE questions ADD COLUMN cluster INTEGER")
+
+    def close(self):
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def ingest(self, header, questions, cos, name=None):
+        # Replaces any earlier ingest of the same (subject_code, name) bank;
+        # name defaults to the exam type line, so CAT-1 and CAT-2 banks of one
+        # subject live side by side
+        subject_code = header.get("subject_code")
+        if not subject_code:
+            raise ValueError("Cannot ingest a bank without a subject code")
+        name = name or header.get("exam_type") or "bank"
+        with self.conn:
+            self.conn.execute(
+                "DELETE FROM banks WHERE subject_code = ? AND name = ?", (subject_code, name)
+            )
+            cur = self.conn.execute(
+                "INSERT INTO banks (subject_code, name, header, course_outcomes, ingested_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (subject_code, name, json.dumps(header), json.dumps(cos), time.time()),
+            )
+            bank_id = cur.lastrowid
+            self.conn.executemany(
+                "INSERT INTO questions (bank_id, position, qid, subject_code, unit, part, text, co, bloom) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    (bank_id, i, _signed(q.qid), subject_code, q.unit, q.part, q.text, q.co, q.bloom)
+                    for i, q in enumerate(questions)
+                ),
+            )
+            self._recluster(subject_code)
+        return bank_id
+
+    def _recluster(self, subject_code):
+        # Near-duplicate clusters span every bank of a subject (a CAT-2 bank
+        # repeating CAT-1 questions), so they are recomputed on each ingest.
+        # cluster holds the qid of the cluster's first question, NULL for a
+        # question that is its own cluster.
+        rows = self.conn.execute(
+            "SELECT bank_id, position, qid, text FROM questions WHERE subject_code = ? "
+            "ORDER BY bank_id, position",
+            (subject_code,),
+        ).fetchall()
+        labels = cluster([text for _, _, _, text in rows])
+        self.conn.executemany(
+            "UPDATE questions SET cluster = ? WHERE bank_id = ? AND position = ?",
+            (
+                (rows[rep][2] if rows[rep][2] != qid else None, bank_id, position)
+                for (bank_id, position, qid, _), rep in zip(rows, labels)
+            ),
+        )
+
+    def clusters(self, subject_code):
+        # {qid: cluster qid} for questions that have a near-duplicate earlier
+        # in the subject's banks
+        rows = self.conn.execute(
+            "SELECT qid, cluster FROM questions WHERE subject_code = ? AND cluster IS NOT NULL",
+            (subject_code,),
+        )
+        return {_unsigned(qid): _unsigned(rep) for qid, rep in rows}
+
+    def subjects(self):
+        rows = self.conn.execute("SELECT DISTINCT subject_code FROM banks ORDER BY subject_code")
+        return [row[0] for row in rows]
+
+    def banks(self, subject_code):
+        # [(name, header, course_outcomes)] in ingest order
+        rows = self.conn.execute(
+            "SELECT name, header, course_outcomes FROM banks WHERE subject_code = ? ORDER BY bank_id",
+            (subject_code,),
+        )
+        return [(name, json.loads(header), json.loads(cos)) for name, header, cos in rows]
+
+    def candidates(self, subject_code, unit=None, part=None, co=None, bloom=None):
+        clauses = ["subject_code = ?"]
+        params = [subject_code]
+        for column, value in (("unit", unit), ("part", part), ("co", co), ("bloom", bloom)):
+            if value is not None:
+                clauses.append(f"{column} = ?")
+                params.append(value)
+        rows = self.conn.execute(
+            "SELECT unit, part, text, co, bloom FROM questions WHERE "
+            + " AND ".join(clauses)
+            + " ORDER BY bank_id, position",
+            params,
+        )
+        return [
+            Question(unit=unit, part=part, text=text, co=co, bloom=bloom)
+            for unit, part, text, co, bloom in rows
+        ]
+
+    def grouped(self, subject_code):
+        # by_unit[unit][part] view for cat_rules generators; each (unit, part)
+        # list is fetched with one indexed query the first time it is used.
+        # key() maps near-duplicates to one cluster, as QuestionPool.key does.
+        groups = _Groups(
+            lambda unit: _Groups(
+                lambda part: self.candidates(subject_code, unit=unit, part=part)
+            )
+        )
+        clusters = self.clusters(subject_code)
+        groups.key = lambda q: clusters.get(q.qid, q.qid)
+        return groups
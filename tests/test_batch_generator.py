@@ -0,0 +1,32 @@
+from batch_generator import best_papers, encode, generate_best_papers
+from blueprint import load_blueprint
+from question import Question
+from question_pool import QuestionPool
+from version_planner import paper_questions
+
+
+def _tight_endsem_pool():
+    counts = {(u, "A"): 6 for u in range(1, 6)}
+    counts.update({(u, "B"): 8 for u in range(1, 6)})
+    return QuestionPool(
+        [Question(u, p, f"U{u}{p} question {i}", "CO1", "K1") for (u, p), n in counts.items() for i in range(n)]
+    )
+
+
+def test_reused_encoding_matches_a_fresh_generation():
+    pool = _tight_endsem_pool()
+    plan = load_blueprint("endsem").plan(pool)
+    enc = encode(pool, plan)
+    assert best_papers(plan, enc, k=3, seed=7) == generate_best_papers(pool, "endsem", k=3, seed=7)
+
+
+def test_avoided_questions_are_drawn_last():
+    pool = _tight_endsem_pool()
+    plan = load_blueprint("endsem").plan(pool)
+    enc = encode(pool, plan)
+    avoid = set()
+    for seed in range(3):
+        ranked = best_papers(plan, enc, k=10, seed=seed, avoid=avoid)
+        keys = {pool.key(q) for q in paper_questions(ranked[0][1])}
+        assert keys.isdisjoint(avoid)
+        avoid |= keys
@@ -0,0 +1,59 @@
+import random
+
+import pytest
+
+from blueprint import load_blueprint
+from cat_rules import generate_cat2_paper
+from question import Question
+from question_pool import QuestionPool
+
+
+def _questions(spec):
+    # spec: {(unit, part): [text, ...]}
+    return [Question(u, p, text, "CO1", "K1") for (u, p), texts in spec.items() for text in texts]
+
+
+def _random_questions(rng):
+    # Small vocabularies, so the same text often sits under several groups
+    vocab = [f"t{i}" for i in range(rng.randint(8, 60))]
+    return [
+        Question(u, p, rng.choice(vocab), "CO1", "K1")
+        for u in range(1, 6)
+        for p in "ABC"
+        for _ in range(rng.choice([0, 1, 2, 2, 3, 3, 4, 5]))
+    ]
+
+
+SHARED_TEXT_CAT2 = {
+    (4, "A"): ["a4-0", "a4-1"], (5, "A"): ["a5-0", "a5-1"], (3, "A"): ["a3-0"],
+    (3, "B"): ["b3"], (4, "B"): ["b4a", "b4b"], (5, "B"): ["shared text", "b5"],
+    (3, "C"): ["c3"], (4, "C"): ["c4"], (5, "C"): ["shared text"],
+}
+
+
+@pytest.mark.parametrize("wrap", [list, QuestionPool])
+def test_text_shared_between_parts_never_fails_mid_draw(wrap):
+    pool = wrap(_questions(SHARED_TEXT_CAT2))
+    load_blueprint("cat2").plan(pool)
+    for seed in range(300):
+        paper = generate_cat2_paper(pool, random.Random(seed))
+        texts = [q.text for section in paper.values() for item in section
+                 for q in ((item["main"], item["or"]) if isinstance(item, dict) else (item,))]
+        assert len(texts) == len(set(texts))
+
+
+def test_bound_plans_never_fail_mid_draw():
+    rng = random.Random(0)
+    bound = 0
+    for _ in range(400):
+        questions = _random_questions(rng)
+        exam = rng.choice(["cat1", "cat2", "endsem"])
+        pool = QuestionPool(questions) if rng.random() < 0.5 else questions
+        try:
+            plan = load_blueprint(exam).plan(pool)
+        except ValueError:
+            continue
+        bound += 1
+        for seed in range(20):
+            plan.sample(random.Random(seed))
+    assert bound > 20
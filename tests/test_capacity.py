@@ -0,0 +1,54 @@
+import random
+
+from blueprint import load_blueprint
+from capacity import analyze
+from cat_rules import generate_cat1_paper
+from question import Question
+from question_pool import QuestionPool
+
+
+def _questions(counts):
+    return [Question(u, p, f"U{u}{p} question {i}", "CO1", "K1") for (u, p), n in counts.items() for i in range(n)]
+
+
+def _random_questions(rng):
+    vocab = [f"t{i}" for i in range(rng.randint(8, 60))]
+    return [
+        Question(u, p, rng.choice(vocab), "CO1", "K1")
+        for u in range(1, 6)
+        for p in "ABC"
+        for _ in range(rng.choice([0, 1, 2, 2, 3, 3, 4, 5]))
+    ]
+
+
+def _binds(questions, exam_type):
+    try:
+        load_blueprint(exam_type).plan(questions)
+    except ValueError:
+        return False
+    return True
+
+
+def test_short_drawn_unit_only_rules_out_its_arrangements():
+    # Unit 1 cannot give an OR pair, but it can take the PART C slot
+    questions = _questions({(1, "A"): 2, (2, "A"): 2, (3, "A"): 1, (1, "B"): 1, (2, "B"): 2, (3, "B"): 2, (1, "C"): 1})
+    result = analyze(questions, "cat1")
+    assert result["problems"] == []
+    assert result["papers"] == 1
+    assert _binds(questions, "cat1")
+    for seed in range(50):
+        paper = generate_cat1_paper(questions, random.Random(seed))
+        assert [q.unit for q in paper["PART_C"]] == [1]
+
+
+def test_problems_match_whether_the_plan_binds():
+    rng = random.Random(1)
+    outcomes = set()
+    for _ in range(600):
+        questions = _random_questions(rng)
+        exam = rng.choice(["cat1", "cat2", "endsem"])
+        pool = QuestionPool(questions) if rng.random() < 0.5 else questions
+        binds = _binds(pool, exam)
+        assert (not analyze(pool, exam)["problems"]) == binds, exam
+        outcomes.add(binds)
+    assert outcomes == {True, False}
@@ -0,0 +1,23 @@
+import os
+from concurrent.futures.process import BrokenProcessPool
+
+import parallel_render
+from parallel_render import render_versions
+
+
+class _KillsWorker:
+    # Unpickling it in a worker ends the worker process
+    def __reduce__(self):
+        return (os._exit, (1,))
+
+
+def test_broken_pool_is_discarded_once(monkeypatch):
+    discarded = []
+    discard = parallel_render._discard_executor
+    monkeypatch.setattr(parallel_render, "_discard_executor", lambda ex: (discarded.append(ex), discard(ex)))
+    papers = [(version, _KillsWorker()) for version in range(1, 4)]
+    out = list(render_versions("cat1", {}, [], papers, "IT", "X", "Dec 2025", workers=3))
+    assert sorted(version for version, _, _ in out) == [1, 2, 3]
+    assert all(isinstance(e, BrokenProcessPool) for _, _, e in out)
+    assert len({id(ex) for ex in discarded}) == 1
+    assert parallel_render._shared_executor().submit(pow, 2, 5).result() == 32
@@ -0,0 +1,37 @@
+import pickle
+import random
+
+from question import Question
+from question_bank import QuestionBank
+
+
+def _bank():
+    rng = random.Random(0)
+    questions = [
+        Question(rng.randint(1, 5), rng.choice("ABC"), f"question {i}", f"CO{rng.randint(1, 6)}", f"K{rng.randint(1, 6)}")
+        for i in range(2000)
+    ]
+    return questions, QuestionBank(questions + questions[:10])
+
+
+def test_repeated_questions_are_stored_once():
+    questions, bank = _bank()
+    assert len(bank) == len(questions)
+    assert all(q in bank for q in questions)
+    assert Question(1, "A", "not in the bank", "CO1", "K1") not in bank
+    assert bank[bank.row_of(questions[123])] == questions[123]
+
+
+def test_rows_match_a_scan():
+    questions, bank = _bank()
+    for query in ({}, {"unit": 3}, {"unit": 2, "part": "C"}, {"co": "CO2", "bloom": 4},
+                  {"unit": 1, "part": "B", "co": 5, "bloom": "K1"}, {"unit": 9}):
+        expected = [
+            row for row, q in enumerate(questions)
+            if q.unit == query.get("unit", q.unit)
+            and q.part == query.get("part", q.part)
+            and int(q.co[2:]) == int(str(query.get("co", q.co)).lstrip("CO"))
+            and int(q.bloom[1:]) == int(str(query.get("bloom", q.bloom)).lstrip("K"))
+        ]
+        assert bank.rows(**query) == expected, query
+        assert pickle.loads(pickle.dumps(bank)).rows(**query) == expected, query
@@ -0,0 +1,32 @@
+from capacity import analyze
+from question import Question
+from question_pool import QuestionPool
+from version_planner import paper_questions, plan_versions
+
+
+def _tight_endsem_pool():
+    # PART A holds exactly three disjoint END SEMESTER papers' worth
+    counts = {(u, "A"): 6 for u in range(1, 6)}
+    counts.update({(u, "B"): 8 for u in range(1, 6)})
+    return QuestionPool(
+        [Question(u, p, f"U{u}{p} question {i}", "CO1", "K1") for (u, p), n in counts.items() for i in range(n)]
+    )
+
+
+def test_versions_reach_capacity_without_sharing():
+    pool = _tight_endsem_pool()
+    versions = analyze(pool, "endsem")["versions"]
+    assert versions == 3
+    for seed in range(20):
+        papers = [paper for _, paper in plan_versions(pool, "endsem", versions, max_overlap=0, seed=seed)]
+        keys = [{pool.key(q) for q in paper_questions(paper)} for paper in papers]
+        assert sum(map(len, keys)) == len(set().union(*keys))
+
+
+def test_overlap_budget_holds():
+    pool = _tight_endsem_pool()
+    papers = [paper for _, paper in plan_versions(pool, "endsem", 5, max_overlap=12, seed="budget")]
+    keys = [{pool.key(q) for q in paper_questions(paper)} for paper in papers]
+    for i, a in enumerate(keys):
+        for b in keys[i + 1:]:
+            assert len(a & b) <= 12
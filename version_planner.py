@@ -0,0 +1,131 @@
+# version_planner.py – several versions of one paper under an overlap budget
+#
+# Each accepted version is kept as a bitset (a Python int, one bit per
+# distinct question in the pool, near-duplicates sharing a bit), so the number of questions two
+# versions share is (a & b).bit_count() – a few machine words per pair instead
+# of building and intersecting sets.
+#
+# Every version is drawn from its own random.Random seeded from (pool digest,
+# blueprint, version seed), so versions never share RNG state. Under a budget
+# the draw is steered away from the questions the other versions hold, so a
+# version is recreated from its seed and those versions; the budget is then
+# checked on the result.
+import random
+
+from blueprint import load_blueprint, paper_rng
+
+
+def paper_questions(paper):
+    for section in paper.values():
+        for item in section:
+            if isinstance(item, dict):
+                yield item["main"]
+                yield item["or"]
+            else:
+                yield item
+
+
+def version_seed(base, version):
+    return f"{base}-v{version}"
+
+
+class VersionPlanner:
+    # max_overlap is the most questions any two versions may share; None
+    # leaves versions unconstrained. bank_hash defaults to the pool digest.
+    def __init__(self, pool, exam_type, max_overlap=None, bank_hash=None):
+        self.blueprint = load_blueprint(exam_type)
+        self.plan = self.blueprint.plan(pool)
+        self.max_overlap = max_overlap
+        self.bank_hash = bank_hash if bank_hash is not None else pool.digest()
+        self.papers = []
+        self.masks = []
+        self.seeds = []
+        self._bits = {}
+
+    def rng(self, seed):
+        return paper_rng(self.bank_hash, self.blueprint, seed)
+
+    def recreate(self, seed, make=None, avoid=None):
+        # make(rng, avoid) -> paper replaces the blueprint sampler, e.g. for
+        # the scored batch generator; it must be deterministic for a given
+        # rng and avoid
+        return (make or self.plan.sample)(self.rng(seed), avoid)
+
+    def avoid(self, skip=None):
+        # Keys of the questions in every accepted version other than skip
+        union = 0
+        for i, other in enumerate(self.masks):
+            if i != skip:
+                union |= other
+        return {k for k, bit in self._bits.items() if union & bit}
+
+    def mask(self, paper):
+        m = 0
+        bits = self._bits
+        key = self.plan.key
+        for q in paper_questions(paper):
+            k = key(q)
+            bit = bits.get(k)
+            if bit is None:
+                bit = bits[k] = 1 << len(bits)
+            m |= bit
+        return m
+
+    def overlap(self, mask, skip=None):
+        # Most questions shared with any accepted version other than skip
+        return max(
+            ((mask & other).bit_count() for i, other in enumerate(self.masks) if i != skip),
+            default=0,
+        )
+
+    def fits(self, mask, skip=None):
+        if self.max_overlap is None:
+            return True
+        limit = self.max_overlap
+        return not any(
+            (mask & other).bit_count() > limit for i, other in enumerate(self.masks) if i != skip
+        )
+
+    def offer(self, paper, index=None, seed=None):
+        # Accepts paper as a new version, or in place of version index, if it
+        # stays within the budget against every other version
+        mask = self.mask(paper)
+        if not self.fits(mask, skip=index):
+            return False
+        if index is None:
+            self.papers.append(paper)
+            self.masks.append(mask)
+            self.seeds.append(seed)
+        else:
+            self.papers[index] = paper
+            self.masks[index] = mask
+            self.seeds[index] = seed
+        return True
+
+    def draw(self, seed, attempts=200, index=None, make=None):
+        # Tries seed, then seed.1, seed.2, ... until a paper fits the budget.
+        # Returns (accepted seed, paper); recreate(accepted seed, make,
+        # avoid(index)) gives the same paper again while the other versions
+        # are unchanged.
+        avoid = self.avoid(skip=index) if self.max_overlap is not None else None
+        best = None
+        for attempt in range(attempts):
+            s = f"{seed}.{attempt}" if attempt else str(seed)
+            paper = self.recreate(s, make, avoid)
+            if self.offer(paper, index, s):
+                return s, paper
+            shared = self.overlap(self.mask(paper), skip=index)
+            best = shared if best is None else min(best, shared)
+        raise ValueError(
+            f"No version sharing at most {self.max_overlap} questions with the others "
+            f"after {attempts} draws (closest shared {best})"
+        )
+
+
+def plan_versions(pool, exam_type, count, max_overlap=None, seed=None, attempts=200):
+    # [(seed, paper)] for versions 1..count
+    base = seed if seed is not None else random.getrandbits(32)
+    planner = VersionPlanner(pool, exam_type, max_overlap)
+    for version in range(1, count + 1):
+        planner.draw(version_seed(base, version), attempts)
+    return list(zip(planner.seeds, planner.papers))